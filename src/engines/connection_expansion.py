@@ -3,7 +3,11 @@ Connection Expansion Engine
 连接扩充引擎 - 基于多维度信息丰富实体关系图谱
 """
 
+import hashlib
+import json
 import logging
+import re
+import sys
 import time
 from typing import List, Dict, Any, Set, Optional, Tuple
 from datetime import datetime, timedelta
@@ -12,29 +16,324 @@ import networkx as nx
 
 from ..models.entities import SecurityEntity, EntityType, EntityStatus
 
+try:
+    import orjson
+except ImportError:  # orjson为可选加速依赖
+    orjson = None
+
+try:
+    import igraph
+except ImportError:  # igraph为可选加速依赖，未安装时退回networkx
+    igraph = None
+
+try:
+    from rbloom import Bloom
+except ImportError:  # rbloom为可选加速依赖，未安装时退回精确set去重
+    Bloom = None
+
+# 候选实体数达到该规模才启用Bloom预过滤，小批量直接用精确set
+_BLOOM_DEDUP_MIN_BATCH = 10000
+
+# 模块级logger：getLogger只在导入时查一次注册表
+logger = logging.getLogger(__name__)
+
+# 实体ID分类用的合并正则：哈希/IP/域名并成单一交替模式，一次C层扫描
+# 同时判别三类，免去逐个模式的多趟匹配（命名组指明命中的分支）
+_CLASSIFY_PATTERN = re.compile(
+    r'^(?:'
+    r'(?P<hash>[0-9a-fA-F]{64}|[0-9a-fA-F]{40}|[0-9a-fA-F]{32})'
+    r'|(?P<ip>(?:\d{1,3}\.){3}\d{1,3})'
+    r'|(?P<domain>(?:[a-zA-Z0-9-]{1,63}\.)+[a-zA-Z]{2,})'
+    r')$'
+)
+
+
+def _q8(value: float) -> int:
+    """把0.0-1.0的权重/置信度量化为0-100的整数
+
+    边metadata里存int8级小整数而不是24B的Python float（CPython缓存
+    小整数对象），百万级边时省约3倍内存，比较也变成纯整数运算；
+    0.01的分辨率对0.3这类阈值无精度损失。
+    """
+    return int(value * 100)
+
+
+def _json_loads(data):
+    """反序列化缓存值，优先走orjson的C实现"""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _json_dumps(obj) -> bytes:
+    """序列化为bytes写入Redis，优先走orjson的C实现"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode()
+
+
+# 资产关系扩充分支表：(实体类型, MATCH模式, kind判别值, 关系类型, 单实体LIMIT)。
+# 单实体与UNWIND批量两种查询由同一张表生成，保证两条路径的图模式一致
+_ASSET_BRANCHES = [
+    ('ip', "(ip:IP {address: %(key)s})-[:BELONGS_TO]->(n:Device)",
+     'device', 'BELONGS_TO', 20),
+    ('ip', "(ip:IP {address: %(key)s})-[:BELONGS_TO]->(:Device)-[:USED_BY]->(n:User)",
+     'user', 'USED_BY', 20),
+    ('ip', "(ip:IP {address: %(key)s})-[:ACCESSED_BY]->(n:Process)",
+     'process', 'ACCESSED_BY', 20),
+    ('user', "(user:User {username: %(key)s})-[:USES]->(n:Device)",
+     'device', 'USES', 30),
+    ('user', "(user:User {username: %(key)s})-[:ACCESSES]->(n:File)",
+     'file', 'ACCESSES', 30),
+    ('user', "(user:User {username: %(key)s})-[:USES]->(:Device)-[:HAS_IP]->(n:IP)",
+     'ip', 'HAS_IP', 30),
+    ('device', "(device:Device {hostname: %(key)s})-[:HAS_IP]->(n:IP)",
+     'ip', 'HAS_IP', 25),
+    ('device', "(device:Device {hostname: %(key)s})-[:USED_BY]->(n:User)",
+     'user', 'USED_BY', 25),
+    ('device', "(device:Device {hostname: %(key)s})-[:RUNS_PROCESS]->(n:Process)",
+     'process', 'RUNS_PROCESS', 25),
+    ('file', "(file:File {path: %(key)s})-[:ACCESSED_BY]->(n:User)",
+     'user', 'ACCESSED_BY', 20),
+    ('file', "(file:File {path: %(key)s})-[:EXECUTED_BY]->(n:Process)",
+     'process', 'EXECUTED_BY', 20),
+    ('file', "(file:File {path: %(key)s})-[:LOCATED_ON]->(n:Device)",
+     'device', 'LOCATED_ON', 20),
+]
+
+
+def _build_asset_query(batch: bool) -> str:
+    """由分支表生成UNION ALL资产扩充查询（单实体或UNWIND批量形态）"""
+    parts = []
+    for entity_type, pattern, kind, rel, limit in _ASSET_BRANCHES:
+        # 置信度阈值直接下推到图查询，低置信节点不出库
+        guard = ("WHERE $entity_type = '%s' "
+                 "AND coalesce(n.confidence, 0.5) >= $min_confidence" % entity_type)
+        if batch:
+            parts.append(
+                "UNWIND $keys AS k\n"
+                "MATCH %s\n"
+                "%s\n"
+                "RETURN k AS key, '%s' AS kind, '%s' AS rel, "
+                "collect(DISTINCT n) AS nodes"
+                % (pattern % {'key': 'k'}, guard, kind, rel)
+            )
+        else:
+            parts.append(
+                "MATCH %s\n"
+                "%s\n"
+                "RETURN '%s' AS kind, '%s' AS rel, "
+                "collect(DISTINCT n)[..%d] AS nodes"
+                % (pattern % {'key': '$key'}, guard, kind, rel, limit)
+            )
+    return "\nUNION ALL\n".join(parts)
+
+
+# 资产关系扩充查询：四类实体的扩充分支用UNION ALL合并成一条参数化Cypher，
+# 每个分支带kind/rel判别列。查询字符串与参数形状固定，Neo4j可缓存执行计划，
+# 单实体扩充只需一次往返
+ASSET_EXPAND_QUERY = _build_asset_query(batch=False)
+
+# 批量形态：UNWIND $keys一次扩充同类型的全部实体，N个实体只需一次往返；
+# 每行附带key列用于把结果归位到源实体。批量路径不限行数，
+# 由下游_filter_by_confidence统一截断
+ASSET_EXPAND_BATCH_QUERY = _build_asset_query(batch=True)
+
+# ClickHouse查询在模块加载时定稿为命名参数形式：查询文本恒定，
+# 服务端可按文本复用解析/计划缓存，客户端也不再逐次拼接SQL
+CH_USER_ANOMALY_QUERY = """
+SELECT DISTINCT src_ip, COUNT(*) as login_count
+FROM login_logs
+WHERE username = %(username)s
+AND timestamp > now() - INTERVAL 7 DAY
+AND is_anomaly = 1
+GROUP BY src_ip
+ORDER BY login_count DESC
+LIMIT 10
+"""
+
+CH_IP_ANOMALY_QUERY = """
+SELECT DISTINCT username, COUNT(*) as access_count
+FROM access_logs
+WHERE src_ip = %(src_ip)s
+AND timestamp > now() - INTERVAL 24 HOUR
+AND is_anomaly = 1
+GROUP BY username
+ORDER BY access_count DESC
+LIMIT 15
+"""
+
+CH_DEVICE_ANOMALY_QUERY = """
+SELECT DISTINCT process_name, COUNT(*) as exec_count
+FROM process_logs
+WHERE hostname = %(hostname)s
+AND timestamp > now() - INTERVAL 12 HOUR
+AND is_anomaly = 1
+GROUP BY process_name
+ORDER BY exec_count DESC
+LIMIT 10
+"""
+
+# 异常边预聚合表：三张日志明细表在写入时物化到一张窄表，
+# 异常扩充查询从扫多GB明细降为读KB级聚合行
+CH_ANOMALY_EDGES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS anomaly_edges (
+        entity_type LowCardinality(String),
+        entity_id String,
+        peer String,
+        anomaly_type LowCardinality(String),
+        window_start DateTime,
+        cnt AggregateFunction(count)
+    ) ENGINE = AggregatingMergeTree
+    ORDER BY (entity_type, entity_id, window_start, peer)
+    """,
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS anomaly_edges_from_login
+    TO anomaly_edges AS
+    SELECT 'user' AS entity_type, username AS entity_id, src_ip AS peer,
+           'unusual_login_location' AS anomaly_type,
+           toStartOfHour(timestamp) AS window_start, countState() AS cnt
+    FROM login_logs WHERE is_anomaly = 1
+    GROUP BY entity_id, peer, window_start
+    """,
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS anomaly_edges_from_access
+    TO anomaly_edges AS
+    SELECT 'ip' AS entity_type, src_ip AS entity_id, username AS peer,
+           'unusual_access_pattern' AS anomaly_type,
+           toStartOfHour(timestamp) AS window_start, countState() AS cnt
+    FROM access_logs WHERE is_anomaly = 1
+    GROUP BY entity_id, peer, window_start
+    """,
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS anomaly_edges_from_process
+    TO anomaly_edges AS
+    SELECT 'device' AS entity_type, hostname AS entity_id, process_name AS peer,
+           'unusual_process_execution' AS anomaly_type,
+           toStartOfHour(timestamp) AS window_start, countState() AS cnt
+    FROM process_logs WHERE is_anomaly = 1
+    GROUP BY entity_id, peer, window_start
+    """,
+]
+
+# 预聚合表就绪后，三类异常查询统一走这一条参数化SELECT
+CH_ANOMALY_EDGES_QUERY = """
+SELECT peer, countMerge(cnt) AS event_count
+FROM anomaly_edges
+WHERE entity_type = %(entity_type)s
+AND entity_id = %(entity_id)s
+AND window_start > now() - INTERVAL %(hours)s HOUR
+GROUP BY peer
+ORDER BY event_count DESC
+LIMIT %(limit)s
+"""
+
+CH_TEMPORAL_IP_QUERY = """
+SELECT DISTINCT dst_ip, COUNT(*) as comm_count
+FROM network_logs
+WHERE src_ip = %(src_ip)s
+AND timestamp > now() - INTERVAL %(hours)s HOUR
+GROUP BY dst_ip
+HAVING comm_count > 5
+ORDER BY comm_count DESC
+LIMIT 20
+"""
+
+CH_TEMPORAL_USER_QUERY = """
+SELECT DISTINCT file_path, COUNT(*) as access_count
+FROM file_access_logs
+WHERE username = %(username)s
+AND timestamp > now() - INTERVAL %(hours)s HOUR
+GROUP BY file_path
+HAVING access_count > 1
+ORDER BY access_count DESC
+LIMIT 15
+"""
+
+
+# kind判别列 -> (实体类型, 实体ID候选字段, 附加metadata字段)
+_ASSET_KIND_SPECS = {
+    'device': (EntityType.DEVICE, ('hostname', 'name'), ('os', 'location')),
+    'user': (EntityType.USER, ('username',), ('department', 'role')),
+    'process': (EntityType.PROCESS, ('name',), ('pid', 'command_line')),
+    'ip': (EntityType.IP, ('address',), ()),
+    'file': (EntityType.FILE, ('path',), ()),
+}
+
+# 高频metadata键/值统一sys.intern：所有metadata字典共享同一字符串对象，
+# 键比较在dict探测时短路为指针相等，也免去每字典一份值副本的内存
+_K_EXPANSION_SOURCE = sys.intern('expansion_source')
+_K_RELATIONSHIP_TYPE = sys.intern('relationship_type')
+_V_ASSET_RELATIONSHIP = sys.intern('asset_relationship')
+_V_BASELINE_ANOMALY = sys.intern('baseline_anomaly')
+_V_TEMPORAL_CORRELATION = sys.intern('temporal_correlation')
+_REL_ANOMALY_RELATED = sys.intern('ANOMALY_RELATED')
+_REL_COMMUNICATES_WITH = sys.intern('COMMUNICATES_WITH')
+_REL_ACCESSES = sys.intern('ACCESSES')
+
+# 关系类型 -> 预烘焙的资产扩充metadata模板。热路径上按模板copy()
+# 而不是逐键重建字面量字典，常量键值对只在模块加载时构造一次
+_ASSET_METADATA_TEMPLATES = {
+    rel: {_K_EXPANSION_SOURCE: _V_ASSET_RELATIONSHIP,
+          _K_RELATIONSHIP_TYPE: sys.intern(rel)}
+    for _, _, _, rel, _ in _ASSET_BRANCHES
+}
+
+# 威胁情报扩充的metadata模板
+_TI_METADATA_TEMPLATE = {
+    _K_EXPANSION_SOURCE: sys.intern('threat_intel'),
+    _K_RELATIONSHIP_TYPE: sys.intern('THREAT_INTEL_RELATED')
+}
+
+# 哈希长度 -> 哈希类型，免分支级联的单次查表
+_HASH_TYPE_TABLE = {32: 'MD5', 40: 'SHA1', 64: 'SHA256'}
+
+# 支持资产关系扩充的实体类型
+_ASSET_EXPANDABLE_TYPES = frozenset({
+    EntityType.IP, EntityType.USER, EntityType.DEVICE, EntityType.FILE
+})
+
 
 class ConnectionExpansionEngine:
     """连接扩充引擎"""
     
     def __init__(self, neo4j_client=None, threat_intel_api=None, 
                  clickhouse_client=None, redis_client=None):
-        self.logger = logging.getLogger(__name__)
+        self.logger = logger
         self.neo4j_client = neo4j_client
         self.threat_intel_api = threat_intel_api
         self.clickhouse_client = clickhouse_client
         self.redis_client = redis_client
         
-        # 创建内存图用于快速关系分析
-        self.asset_graph = nx.Graph()
+        # 创建内存图用于快速关系分析：优先用igraph（C内核，万级节点的
+        # BFS/最短路比纯Python的networkx快1-2个数量级，内存约省5倍），
+        # 未安装时退回networkx
+        if igraph is not None:
+            self.asset_graph = igraph.Graph(directed=False)
+            # entity_key -> igraph顶点ID，保证O(1)定位
+            self._vertex_ids: Optional[Dict[Tuple[str, str], int]] = {}
+        else:
+            self.asset_graph = nx.Graph()
+            self._vertex_ids = None
         
         # 扩充策略配置
         self.expansion_config = {
             'max_expansion_depth': 3,
             'max_entities_per_expansion': 50,
             'time_window_hours': 24,
-            'min_confidence_threshold': 0.3
+            'min_confidence_threshold': 0.3,
+            'threat_intel_cache_ttl': 3600,
+            'expansion_cache_bucket_seconds': 300
         }
         
+        # 异常边预聚合表是否可用（async_init中建表成功后置True）
+        self._anomaly_view_ready = False
+
+        # 威胁情报在途请求表：同一IoC的并发查询共享一个任务，
+        # 第N个并发调用直接等待第一个的结果而不是再发一次HTTP
+        self._ti_inflight: Dict[str, asyncio.Task] = {}
+        # 信号量限制对外部情报API的并发，尊重其速率限制
+        self._ti_semaphore = asyncio.Semaphore(10)
+
         # 关系类型权重
         self.relationship_weights = {
             'COMMUNICATES_WITH': 0.8,
@@ -47,15 +346,48 @@ class ConnectionExpansionEngine:
             'THREAT_INTEL_RELATED': 0.9,
             'ANOMALY_RELATED': 0.7
         }
+
+        # 量化后的关系权重（×100整数），建边热路径直接取用
+        self._relationship_weights_q8 = {
+            rel: _q8(weight) for rel, weight in self.relationship_weights.items()
+        }
     
-    async def expand_entity_connections(self, entity: SecurityEntity, 
+    async def async_init(self):
+        """异步初始化：幂等创建ClickHouse异常边预聚合表及物化视图"""
+        if not self.clickhouse_client:
+            return
+
+        try:
+            for ddl in CH_ANOMALY_EDGES_DDL:
+                await self.clickhouse_client.execute(ddl)
+            self._anomaly_view_ready = True
+            self.logger.info("Anomaly edges materialized view ready")
+        except Exception as e:
+            self.logger.warning(
+                f"Anomaly materialized view unavailable, falling back to raw log scans: {e}")
+
+    async def expand_entity_connections(self, entity: SecurityEntity,
                                       expansion_methods: List[str] = None) -> List[SecurityEntity]:
         """扩充实体连接关系"""
         if expansion_methods is None:
             expansion_methods = ['asset_relationship', 'threat_intel', 'baseline_anomaly', 'temporal_correlation']
         
         expanded_entities = []
-        
+
+        # 同一实体短时间内反复触发告警时，直接复用整次扩充结果
+        cache_key = self._expansion_cache_key(entity, expansion_methods)
+        if cache_key:
+            try:
+                cached = await self.redis_client.get(cache_key)
+                if cached:
+                    expanded_entities = [SecurityEntity.from_dict(d)
+                                         for d in _json_loads(cached)]
+                    self._establish_connections(entity, expanded_entities)
+                    entity.update_status(EntityStatus.INVESTIGATED, "完成连接扩充")
+                    return expanded_entities
+            except Exception as e:
+                self.logger.warning("Expansion cache read failed: %s", e)
+
         try:
             # 并行执行不同的扩充方法
             tasks = []
@@ -80,12 +412,22 @@ class ConnectionExpansionEngine:
                 if isinstance(result, list):
                     expanded_entities.extend(result)
                 elif isinstance(result, Exception):
-                    self.logger.error(f"Expansion task failed: {result}")
+                    self.logger.error("Expansion task failed: %s", result)
             
             # 去重和过滤
             expanded_entities = self._deduplicate_entities(expanded_entities)
             expanded_entities = self._filter_by_confidence(expanded_entities)
-            
+
+            if cache_key:
+                try:
+                    await self.redis_client.setex(
+                        cache_key,
+                        self.expansion_config['expansion_cache_bucket_seconds'],
+                        _json_dumps([e.to_dict() for e in expanded_entities])
+                    )
+                except Exception as e:
+                    self.logger.warning("Expansion cache write failed: %s", e)
+
             # 建立连接关系
             self._establish_connections(entity, expanded_entities)
             
@@ -93,297 +435,272 @@ class ConnectionExpansionEngine:
             entity.update_status(EntityStatus.INVESTIGATED, "完成连接扩充")
             
         except Exception as e:
-            self.logger.error(f"Error expanding entity connections: {e}")
+            self.logger.error("Error expanding entity connections: %s", e)
         
         return expanded_entities
-    
-    async def _expand_by_asset_relationship(self, entity: SecurityEntity) -> List[SecurityEntity]:
-        """基于资产责任关系扩充"""
-        expanded_entities = []
-        
+
+    async def expand_entities_batch(self, entities: List[SecurityEntity],
+                                    expansion_methods: List[str] = None
+                                    ) -> Dict[Tuple[EntityType, str], List[SecurityEntity]]:
+        """批量扩充实体连接关系
+
+        资产关系扩充按实体类型分组后走UNWIND批量查询，同类型N个实体
+        只产生一次Neo4j往返；其余扩充方法仍按实体并行执行。
+        返回 (entity_type, entity_id) -> 扩充实体列表 的映射。
+        """
+        if expansion_methods is None:
+            expansion_methods = ['asset_relationship', 'threat_intel', 'baseline_anomaly', 'temporal_correlation']
+
+        results: Dict[Tuple[EntityType, str], List[SecurityEntity]] = {
+            (entity.entity_type, entity.entity_id): [] for entity in entities
+        }
+
+        other_expanders = {
+            'threat_intel': self._expand_by_threat_intel,
+            'baseline_anomaly': self._expand_by_baseline_anomaly,
+            'temporal_correlation': self._expand_by_temporal_correlation,
+        }
+
         try:
-            if entity.entity_type == EntityType.IP:
-                expanded_entities.extend(await self._expand_ip_by_asset(entity))
-            elif entity.entity_type == EntityType.USER:
-                expanded_entities.extend(await self._expand_user_by_asset(entity))
-            elif entity.entity_type == EntityType.DEVICE:
-                expanded_entities.extend(await self._expand_device_by_asset(entity))
-            elif entity.entity_type == EntityType.FILE:
-                expanded_entities.extend(await self._expand_file_by_asset(entity))
-        
+            if 'asset_relationship' in expansion_methods:
+                asset_results = await self._expand_assets_batch(entities)
+                for key, expanded in asset_results.items():
+                    results[key].extend(expanded)
+
+            # 其余扩充方法仍逐实体并行执行
+            tasks = []
+            task_keys = []
+            for entity in entities:
+                for method in expansion_methods:
+                    expander = other_expanders.get(method)
+                    if expander is not None:
+                        tasks.append(expander(entity))
+                        task_keys.append((entity.entity_type, entity.entity_id))
+
+            if tasks:
+                other_results = await asyncio.gather(*tasks, return_exceptions=True)
+                for key, result in zip(task_keys, other_results):
+                    if isinstance(result, list):
+                        results[key].extend(result)
+                    elif isinstance(result, Exception):
+                        self.logger.error("Batch expansion task failed: %s", result)
+
+            # 按实体统一去重、过滤并建立连接
+            for entity in entities:
+                key = (entity.entity_type, entity.entity_id)
+                expanded = self._filter_by_confidence(
+                    self._deduplicate_entities(results[key]))
+                self._establish_connections(entity, expanded)
+                entity.update_status(EntityStatus.INVESTIGATED, "完成连接扩充")
+                results[key] = expanded
+
         except Exception as e:
-            self.logger.error(f"Asset relationship expansion failed: {e}")
-        
-        return expanded_entities
-    
-    async def _expand_ip_by_asset(self, ip_entity: SecurityEntity) -> List[SecurityEntity]:
-        """基于IP扩充相关资产"""
-        entities = []
-        
+            self.logger.error("Error in batch entity expansion: %s", e)
+
+        return results
+
+    async def expand_multi_hop(self, seed: SecurityEntity,
+                               depth: int = None) -> List[SecurityEntity]:
+        """从种子实体出发做多跳并行BFS扩充
+
+        逐层推进：同一层的全部frontier实体走expand_entities_batch的
+        UNWIND批量查询与流水线事务，一层只付一轮数据库往返；visited
+        集合按(类型, ID)去环。第一跳应用全部扩充方法，后续跳只走
+        资产关系——情报/基线类方法对间接实体噪音过大且代价高。
+        """
+        if depth is None:
+            depth = self.expansion_config['max_expansion_depth']
+
+        visited: Set[Tuple[EntityType, str]] = {(seed.entity_type, seed.entity_id)}
+        frontier = [seed]
+        discovered: List[SecurityEntity] = []
+
+        for hop in range(depth):
+            if not frontier:
+                break
+            methods = None if hop == 0 else ['asset_relationship']
+            hop_results = await self.expand_entities_batch(frontier, methods)
+
+            next_frontier = []
+            for expanded in hop_results.values():
+                for entity in expanded:
+                    key = (entity.entity_type, entity.entity_id)
+                    if key in visited:
+                        continue
+                    visited.add(key)
+                    discovered.append(entity)
+                    next_frontier.append(entity)
+            frontier = next_frontier
+
+        return discovered
+
+    async def _expand_assets_batch(self, entities: List[SecurityEntity]
+                                   ) -> Dict[Tuple[EntityType, str], List[SecurityEntity]]:
+        """按类型分组执行UNWIND批量资产扩充"""
+        results: Dict[Tuple[EntityType, str], List[SecurityEntity]] = {}
+
         if not self.neo4j_client:
-            return entities
-        
-        try:
-            # 查找IP对应的设备和用户
-            query = """
-            MATCH (ip:IP {address: $ip_address})
-            OPTIONAL MATCH (ip)-[:BELONGS_TO]->(device:Device)
-            OPTIONAL MATCH (device)-[:USED_BY]->(user:User)
-            OPTIONAL MATCH (ip)-[:ACCESSED_BY]->(process:Process)
-            RETURN device, user, process
-            LIMIT 20
-            """
-            
-            result = await self.neo4j_client.run(query, ip_address=ip_entity.entity_id)
-            
-            async for record in result:
-                # 设备实体
-                if record.get('device'):
-                    device = record['device']
-                    device_entity = SecurityEntity(
-                        entity_type=EntityType.DEVICE,
-                        entity_id=device.get('hostname', device.get('name')),
-                        status=EntityStatus.INVESTIGATED,
-                        metadata={
-                            'expansion_source': 'asset_relationship',
-                            'relationship_type': 'BELONGS_TO',
-                            'os': device.get('os'),
-                            'location': device.get('location')
-                        }
-                    )
-                    entities.append(device_entity)
-                
-                # 用户实体
-                if record.get('user'):
-                    user = record['user']
-                    user_entity = SecurityEntity(
-                        entity_type=EntityType.USER,
-                        entity_id=user.get('username'),
-                        status=EntityStatus.INVESTIGATED,
-                        metadata={
-                            'expansion_source': 'asset_relationship',
-                            'relationship_type': 'USED_BY',
-                            'department': user.get('department'),
-                            'role': user.get('role')
-                        }
-                    )
-                    entities.append(user_entity)
-                
-                # 进程实体
-                if record.get('process'):
-                    process = record['process']
-                    process_entity = SecurityEntity(
-                        entity_type=EntityType.PROCESS,
-                        entity_id=process.get('name'),
-                        status=EntityStatus.INVESTIGATED,
-                        metadata={
-                            'expansion_source': 'asset_relationship',
-                            'relationship_type': 'ACCESSED_BY',
-                            'pid': process.get('pid'),
-                            'command_line': process.get('command_line')
-                        }
+            return results
+
+        grouped: Dict[EntityType, List[str]] = {}
+        for entity in entities:
+            if entity.entity_type in _ASSET_EXPANDABLE_TYPES:
+                grouped.setdefault(entity.entity_type, []).append(entity.entity_id)
+
+        if not grouped:
+            return results
+
+        min_confidence = self.expansion_config['min_confidence_threshold']
+
+        if hasattr(self.neo4j_client, 'session'):
+            # 显式事务把各类型的查询背靠背写入同一连接，Bolt将RUN/PULL
+            # 流水线化，整个批量只占一次网络往返
+            try:
+                async with self.neo4j_client.session() as session:
+                    tx = await session.begin_transaction()
+                    try:
+                        pending = []
+                        for entity_type, keys in grouped.items():
+                            pending.append((entity_type, await tx.run(
+                                ASSET_EXPAND_BATCH_QUERY,
+                                entity_type=entity_type.value,
+                                keys=keys,
+                                min_confidence=min_confidence
+                            )))
+                        for entity_type, result in pending:
+                            await self._consume_asset_result(entity_type, result, results)
+                    finally:
+                        # 只读事务，关闭即回滚
+                        await tx.close()
+            except Exception as e:
+                self.logger.error("Batch asset expansion transaction failed: %s", e)
+        else:
+            # 客户端不支持显式会话时退回逐类型自动提交查询
+            for entity_type, keys in grouped.items():
+                try:
+                    result = await self.neo4j_client.run(
+                        ASSET_EXPAND_BATCH_QUERY,
+                        entity_type=entity_type.value,
+                        keys=keys,
+                        min_confidence=min_confidence
                     )
-                    entities.append(process_entity)
-        
-        except Exception as e:
-            self.logger.error(f"IP asset expansion failed: {e}")
-        
-        return entities
-    
-    async def _expand_user_by_asset(self, user_entity: SecurityEntity) -> List[SecurityEntity]:
-        """基于用户扩充相关资产"""
-        entities = []
-        
-        if not self.neo4j_client:
-            return entities
-        
+                    await self._consume_asset_result(entity_type, result, results)
+                except Exception as e:
+                    self.logger.error("Batch asset expansion failed for %s: %s", entity_type.value, e)
+
+        return results
+
+    async def _consume_asset_result(self, entity_type: EntityType, result,
+                                    results: Dict[Tuple[EntityType, str], List[SecurityEntity]]):
+        """消费批量资产查询结果并按key归位到源实体"""
+        async for record in self._iter_records(result):
+            parsed = self._parse_asset_record(record)
+            if parsed:
+                key = (entity_type, record.get('key'))
+                results.setdefault(key, []).extend(parsed)
+
+    def _expansion_cache_key(self, entity: SecurityEntity,
+                             expansion_methods: List[str]) -> Optional[str]:
+        """计算整次扩充的缓存键；未注入Redis时返回None
+
+        键覆盖实体、方法集合与时间窗口，时间戳按固定粒度分桶，
+        邻近的重复调用落在同一键上。
+        """
+        if not self.redis_client:
+            return None
+
+        bucket_seconds = self.expansion_config['expansion_cache_bucket_seconds']
+        raw = '|'.join((
+            entity.entity_type.value,
+            entity.entity_id,
+            ','.join(sorted(expansion_methods)),
+            str(self.expansion_config['time_window_hours']),
+            str(int(time.time() // bucket_seconds))
+        ))
+        digest = hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+        return f"expansion:{digest}"
+
+    async def _expand_by_asset_relationship(self, entity: SecurityEntity) -> List[SecurityEntity]:
+        """基于资产责任关系扩充"""
+        expanded_entities = []
+
+        if not self.neo4j_client or entity.entity_type not in _ASSET_EXPANDABLE_TYPES:
+            return expanded_entities
+
         try:
-            # 查找用户使用的设备和访问的资源
-            query = """
-            MATCH (user:User {username: $username})
-            OPTIONAL MATCH (user)-[:USES]->(device:Device)
-            OPTIONAL MATCH (user)-[:ACCESSES]->(file:File)
-            OPTIONAL MATCH (device)-[:HAS_IP]->(ip:IP)
-            RETURN device, file, ip
-            LIMIT 30
-            """
-            
-            result = await self.neo4j_client.run(query, username=user_entity.entity_id)
-            
-            async for record in result:
-                # 设备实体
-                if record.get('device'):
-                    device = record['device']
-                    device_entity = SecurityEntity(
-                        entity_type=EntityType.DEVICE,
-                        entity_id=device.get('hostname'),
-                        status=EntityStatus.INVESTIGATED,
-                        metadata={
-                            'expansion_source': 'asset_relationship',
-                            'relationship_type': 'USES'
-                        }
-                    )
-                    entities.append(device_entity)
-                
-                # 文件实体
-                if record.get('file'):
-                    file = record['file']
-                    file_entity = SecurityEntity(
-                        entity_type=EntityType.FILE,
-                        entity_id=file.get('path'),
-                        status=EntityStatus.INVESTIGATED,
-                        metadata={
-                            'expansion_source': 'asset_relationship',
-                            'relationship_type': 'ACCESSES'
-                        }
-                    )
-                    entities.append(file_entity)
-                
-                # IP实体
-                if record.get('ip'):
-                    ip = record['ip']
-                    ip_entity = SecurityEntity(
-                        entity_type=EntityType.IP,
-                        entity_id=ip.get('address'),
-                        status=EntityStatus.INVESTIGATED,
-                        metadata={
-                            'expansion_source': 'asset_relationship',
-                            'relationship_type': 'HAS_IP'
-                        }
-                    )
-                    entities.append(ip_entity)
-        
+            # 单条UNION查询一次取回所有类型的关联资产
+            result = await self.neo4j_client.run(
+                ASSET_EXPAND_QUERY,
+                entity_type=entity.entity_type.value,
+                key=entity.entity_id,
+                min_confidence=self.expansion_config['min_confidence_threshold']
+            )
+
+            async for record in self._iter_records(result):
+                expanded_entities.extend(self._parse_asset_record(record))
+
         except Exception as e:
-            self.logger.error(f"User asset expansion failed: {e}")
-        
-        return entities
-    
-    async def _expand_device_by_asset(self, device_entity: SecurityEntity) -> List[SecurityEntity]:
-        """基于设备扩充相关资产"""
-        entities = []
-        
-        if not self.neo4j_client:
-            return entities
-        
-        try:
-            query = """
-            MATCH (device:Device {hostname: $hostname})
-            OPTIONAL MATCH (device)-[:HAS_IP]->(ip:IP)
-            OPTIONAL MATCH (device)-[:USED_BY]->(user:User)
-            OPTIONAL MATCH (device)-[:RUNS_PROCESS]->(process:Process)
-            RETURN ip, user, process
-            LIMIT 25
-            """
-            
-            result = await self.neo4j_client.run(query, hostname=device_entity.entity_id)
-            
+            self.logger.error("Asset relationship expansion failed: %s", e)
+
+        return expanded_entities
+
+    @staticmethod
+    async def _iter_records(result):
+        """分块消费驱动结果
+
+        支持fetch(n)的驱动按50条一页拉取，Bolt在Python解析当前页时
+        已在接收下一页，网络等待与CPU解析重叠；其余驱动退回逐条异步迭代。
+        """
+        fetch = getattr(result, 'fetch', None)
+        if fetch is not None:
+            while rows := await fetch(50):
+                for record in rows:
+                    yield record
+        else:
             async for record in result:
-                if record.get('ip'):
-                    ip = record['ip']
-                    ip_entity = SecurityEntity(
-                        entity_type=EntityType.IP,
-                        entity_id=ip.get('address'),
-                        status=EntityStatus.INVESTIGATED,
-                        metadata={
-                            'expansion_source': 'asset_relationship',
-                            'relationship_type': 'HAS_IP'
-                        }
-                    )
-                    entities.append(ip_entity)
-                
-                if record.get('user'):
-                    user = record['user']
-                    user_entity = SecurityEntity(
-                        entity_type=EntityType.USER,
-                        entity_id=user.get('username'),
-                        status=EntityStatus.INVESTIGATED,
-                        metadata={
-                            'expansion_source': 'asset_relationship',
-                            'relationship_type': 'USED_BY'
-                        }
-                    )
-                    entities.append(user_entity)
-                
-                if record.get('process'):
-                    process = record['process']
-                    process_entity = SecurityEntity(
-                        entity_type=EntityType.PROCESS,
-                        entity_id=process.get('name'),
-                        status=EntityStatus.INVESTIGATED,
-                        metadata={
-                            'expansion_source': 'asset_relationship',
-                            'relationship_type': 'RUNS_PROCESS'
-                        }
-                    )
-                    entities.append(process_entity)
-        
-        except Exception as e:
-            self.logger.error(f"Device asset expansion failed: {e}")
-        
-        return entities
-    
-    async def _expand_file_by_asset(self, file_entity: SecurityEntity) -> List[SecurityEntity]:
-        """基于文件扩充相关资产"""
+                yield record
+
+    def _parse_asset_record(self, record) -> List[SecurityEntity]:
+        """根据kind判别列解析UNION查询返回的记录
+
+        每条记录对应一个分支，nodes列是数据库端已用collect(DISTINCT)
+        去重后的节点列表。
+        """
+        spec = _ASSET_KIND_SPECS.get(record.get('kind'))
+        nodes = record.get('nodes')
+        if spec is None or not nodes:
+            return []
+
+        entity_type, id_fields, extra_fields = spec
+        rel = record.get('rel')
+        template = _ASSET_METADATA_TEMPLATES.get(rel) or {
+            _K_EXPANSION_SOURCE: _V_ASSET_RELATIONSHIP,
+            _K_RELATIONSHIP_TYPE: rel
+        }
         entities = []
-        
-        if not self.neo4j_client:
-            return entities
-        
-        try:
-            query = """
-            MATCH (file:File {path: $file_path})
-            OPTIONAL MATCH (file)-[:ACCESSED_BY]->(user:User)
-            OPTIONAL MATCH (file)-[:EXECUTED_BY]->(process:Process)
-            OPTIONAL MATCH (file)-[:LOCATED_ON]->(device:Device)
-            RETURN user, process, device
-            LIMIT 20
-            """
-            
-            result = await self.neo4j_client.run(query, file_path=file_entity.entity_id)
-            
-            async for record in result:
-                if record.get('user'):
-                    user = record['user']
-                    user_entity = SecurityEntity(
-                        entity_type=EntityType.USER,
-                        entity_id=user.get('username'),
-                        status=EntityStatus.INVESTIGATED,
-                        metadata={
-                            'expansion_source': 'asset_relationship',
-                            'relationship_type': 'ACCESSED_BY'
-                        }
-                    )
-                    entities.append(user_entity)
-                
-                if record.get('process'):
-                    process = record['process']
-                    process_entity = SecurityEntity(
-                        entity_type=EntityType.PROCESS,
-                        entity_id=process.get('name'),
-                        status=EntityStatus.INVESTIGATED,
-                        metadata={
-                            'expansion_source': 'asset_relationship',
-                            'relationship_type': 'EXECUTED_BY'
-                        }
-                    )
-                    entities.append(process_entity)
-                
-                if record.get('device'):
-                    device = record['device']
-                    device_entity = SecurityEntity(
-                        entity_type=EntityType.DEVICE,
-                        entity_id=device.get('hostname'),
-                        status=EntityStatus.INVESTIGATED,
-                        metadata={
-                            'expansion_source': 'asset_relationship',
-                            'relationship_type': 'LOCATED_ON'
-                        }
-                    )
-                    entities.append(device_entity)
-        
-        except Exception as e:
-            self.logger.error(f"File asset expansion failed: {e}")
-        
+
+        for node in nodes:
+            entity_id = None
+            for field_name in id_fields:
+                entity_id = node.get(field_name)
+                if entity_id is not None:
+                    break
+            if entity_id is None:
+                continue
+
+            metadata = template.copy()
+            for field_name in extra_fields:
+                value = node.get(field_name)
+                if value is not None:
+                    metadata[field_name] = value
+
+            entities.append(SecurityEntity(
+                entity_type=entity_type,
+                entity_id=entity_id,
+                status=EntityStatus.INVESTIGATED,
+                metadata=metadata
+            ))
+
         return entities
     
     async def _expand_by_threat_intel(self, entity: SecurityEntity) -> List[SecurityEntity]:
@@ -394,67 +711,110 @@ class ConnectionExpansionEngine:
             return entities
         
         try:
-            threat_info = None
-            
-            if entity.entity_type == EntityType.IP:
-                threat_info = await self.threat_intel_api.query_ip(entity.entity_id)
-            elif entity.entity_type == EntityType.DOMAIN:
-                threat_info = await self.threat_intel_api.query_domain(entity.entity_id)
-            elif entity.entity_type == EntityType.FILE:
-                # 如果是哈希值
-                if entity.metadata.get('is_hash'):
-                    threat_info = await self.threat_intel_api.query_hash(entity.entity_id)
-            
+            threat_info = await self._query_threat_intel(entity)
+
             if threat_info:
+                # 同一份情报下所有关联IoC的metadata键集合相同，
+                # 每类原型只构造一次，循环内仅做浅拷贝
+                threat_types = threat_info.get('threat_types', [])
+                ip_proto = {**_TI_METADATA_TEMPLATE,
+                            'threat_types': threat_types,
+                            'confidence': threat_info.get('confidence', 0.5)}
+                domain_proto = {**_TI_METADATA_TEMPLATE,
+                                'threat_types': threat_types}
+                hash_proto = {**_TI_METADATA_TEMPLATE, 'is_hash': True}
+
                 # 处理相关IP
                 for related_ip in threat_info.get('related_ips', []):
-                    ip_entity = SecurityEntity(
+                    entities.append(SecurityEntity(
                         entity_type=EntityType.IP,
                         entity_id=related_ip,
                         status=EntityStatus.INVESTIGATED,
-                        metadata={
-                            'expansion_source': 'threat_intel',
-                            'relationship_type': 'THREAT_INTEL_RELATED',
-                            'threat_types': threat_info.get('threat_types', []),
-                            'confidence': threat_info.get('confidence', 0.5)
-                        }
-                    )
-                    entities.append(ip_entity)
-                
+                        metadata=ip_proto.copy()
+                    ))
+
                 # 处理相关域名
                 for related_domain in threat_info.get('related_domains', []):
-                    domain_entity = SecurityEntity(
+                    entities.append(SecurityEntity(
                         entity_type=EntityType.DOMAIN,
                         entity_id=related_domain,
                         status=EntityStatus.INVESTIGATED,
-                        metadata={
-                            'expansion_source': 'threat_intel',
-                            'relationship_type': 'THREAT_INTEL_RELATED',
-                            'threat_types': threat_info.get('threat_types', [])
-                        }
-                    )
-                    entities.append(domain_entity)
-                
+                        metadata=domain_proto.copy()
+                    ))
+
                 # 处理相关哈希
                 for related_hash in threat_info.get('related_hashes', []):
-                    hash_entity = SecurityEntity(
+                    metadata = hash_proto.copy()
+                    metadata['hash_type'] = self._determine_hash_type(related_hash)
+                    entities.append(SecurityEntity(
                         entity_type=EntityType.FILE,
                         entity_id=related_hash,
                         status=EntityStatus.INVESTIGATED,
-                        metadata={
-                            'expansion_source': 'threat_intel',
-                            'relationship_type': 'THREAT_INTEL_RELATED',
-                            'is_hash': True,
-                            'hash_type': self._determine_hash_type(related_hash)
-                        }
-                    )
-                    entities.append(hash_entity)
+                        metadata=metadata
+                    ))
         
         except Exception as e:
-            self.logger.error(f"Threat intel expansion failed: {e}")
-        
+            self.logger.error("Threat intel expansion failed: %s", e)
+
         return entities
-    
+
+    async def _query_threat_intel(self, entity: SecurityEntity) -> Optional[Dict[str, Any]]:
+        """查询威胁情报，命中Redis缓存时省去外部API往返
+
+        热门IoC在短时间内会被重复研判，缓存键按 (类型, 实体ID) 组织，
+        TTL与情报新鲜度要求对齐。
+        """
+        if entity.entity_type == EntityType.IP:
+            kind, query = 'ip', self.threat_intel_api.query_ip
+        elif entity.entity_type == EntityType.DOMAIN:
+            kind, query = 'domain', self.threat_intel_api.query_domain
+        elif entity.entity_type == EntityType.FILE and (
+                entity.metadata.get('is_hash')
+                or self._classify(entity.entity_id) == EntityType.FILE):
+            # metadata未标注is_hash时按实体ID单趟判别，补上裸哈希的情报查询
+            kind, query = 'hash', self.threat_intel_api.query_hash
+        else:
+            return None
+
+        cache_key = f"ti:{kind}:{entity.entity_id}"
+
+        if self.redis_client:
+            try:
+                cached = await self.redis_client.get(cache_key)
+                if cached:
+                    return _json_loads(cached)
+            except Exception as e:
+                self.logger.warning("Threat intel cache read failed: %s", e)
+
+        # 合并在途请求：事件循环单线程，get/set之间无await，无需加锁
+        task = self._ti_inflight.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._fetch_threat_intel(cache_key, query, entity.entity_id))
+            self._ti_inflight[cache_key] = task
+            task.add_done_callback(
+                lambda _t, key=cache_key: self._ti_inflight.pop(key, None))
+
+        return await task
+
+    async def _fetch_threat_intel(self, cache_key: str, query,
+                                  ioc: str) -> Optional[Dict[str, Any]]:
+        """实际执行威胁情报查询并回填缓存（受并发信号量约束）"""
+        async with self._ti_semaphore:
+            threat_info = await query(ioc)
+
+        if threat_info and self.redis_client:
+            try:
+                await self.redis_client.setex(
+                    cache_key,
+                    self.expansion_config['threat_intel_cache_ttl'],
+                    _json_dumps(threat_info)
+                )
+            except Exception as e:
+                self.logger.warning("Threat intel cache write failed: %s", e)
+
+        return threat_info
+
     async def _expand_by_baseline_anomaly(self, entity: SecurityEntity) -> List[SecurityEntity]:
         """基于基线异常扩充"""
         entities = []
@@ -472,7 +832,7 @@ class ConnectionExpansionEngine:
                 entities.extend(await self._find_device_anomalies(entity))
         
         except Exception as e:
-            self.logger.error(f"Baseline anomaly expansion failed: {e}")
+            self.logger.error("Baseline anomaly expansion failed: %s", e)
         
         return entities
     
@@ -481,19 +841,15 @@ class ConnectionExpansionEngine:
         entities = []
         
         try:
-            # 查找异常登录IP
-            query = """
-            SELECT DISTINCT src_ip, COUNT(*) as login_count
-            FROM login_logs 
-            WHERE username = %s 
-            AND timestamp > now() - INTERVAL 7 DAY
-            AND is_anomaly = 1
-            GROUP BY src_ip
-            ORDER BY login_count DESC
-            LIMIT 10
-            """
-            
-            result = await self.clickhouse_client.execute(query, (user_entity.entity_id,))
+            # 查找异常登录IP（优先读预聚合表，扫描量从GB级降到KB级）
+            if self._anomaly_view_ready:
+                result = await self.clickhouse_client.execute(
+                    CH_ANOMALY_EDGES_QUERY,
+                    {'entity_type': 'user', 'entity_id': user_entity.entity_id,
+                     'hours': 7 * 24, 'limit': 10})
+            else:
+                result = await self.clickhouse_client.execute(
+                    CH_USER_ANOMALY_QUERY, {'username': user_entity.entity_id})
             
             for row in result:
                 ip_entity = SecurityEntity(
@@ -501,8 +857,8 @@ class ConnectionExpansionEngine:
                     entity_id=row[0],
                     status=EntityStatus.INVESTIGATED,
                     metadata={
-                        'expansion_source': 'baseline_anomaly',
-                        'relationship_type': 'ANOMALY_RELATED',
+                        _K_EXPANSION_SOURCE: _V_BASELINE_ANOMALY,
+                        _K_RELATIONSHIP_TYPE: _REL_ANOMALY_RELATED,
                         'anomaly_type': 'unusual_login_location',
                         'event_count': row[1]
                     }
@@ -510,7 +866,7 @@ class ConnectionExpansionEngine:
                 entities.append(ip_entity)
         
         except Exception as e:
-            self.logger.error(f"User anomaly expansion failed: {e}")
+            self.logger.error("User anomaly expansion failed: %s", e)
         
         return entities
     
@@ -519,19 +875,15 @@ class ConnectionExpansionEngine:
         entities = []
         
         try:
-            # 查找从该IP登录的异常用户
-            query = """
-            SELECT DISTINCT username, COUNT(*) as access_count
-            FROM access_logs 
-            WHERE src_ip = %s 
-            AND timestamp > now() - INTERVAL 24 HOUR
-            AND is_anomaly = 1
-            GROUP BY username
-            ORDER BY access_count DESC
-            LIMIT 15
-            """
-            
-            result = await self.clickhouse_client.execute(query, (ip_entity.entity_id,))
+            # 查找从该IP登录的异常用户（优先读预聚合表）
+            if self._anomaly_view_ready:
+                result = await self.clickhouse_client.execute(
+                    CH_ANOMALY_EDGES_QUERY,
+                    {'entity_type': 'ip', 'entity_id': ip_entity.entity_id,
+                     'hours': 24, 'limit': 15})
+            else:
+                result = await self.clickhouse_client.execute(
+                    CH_IP_ANOMALY_QUERY, {'src_ip': ip_entity.entity_id})
             
             for row in result:
                 user_entity = SecurityEntity(
@@ -539,8 +891,8 @@ class ConnectionExpansionEngine:
                     entity_id=row[0],
                     status=EntityStatus.INVESTIGATED,
                     metadata={
-                        'expansion_source': 'baseline_anomaly',
-                        'relationship_type': 'ANOMALY_RELATED',
+                        _K_EXPANSION_SOURCE: _V_BASELINE_ANOMALY,
+                        _K_RELATIONSHIP_TYPE: _REL_ANOMALY_RELATED,
                         'anomaly_type': 'unusual_access_pattern',
                         'event_count': row[1]
                     }
@@ -548,7 +900,7 @@ class ConnectionExpansionEngine:
                 entities.append(user_entity)
         
         except Exception as e:
-            self.logger.error(f"IP anomaly expansion failed: {e}")
+            self.logger.error("IP anomaly expansion failed: %s", e)
         
         return entities
     
@@ -557,19 +909,15 @@ class ConnectionExpansionEngine:
         entities = []
         
         try:
-            # 查找设备上的异常进程
-            query = """
-            SELECT DISTINCT process_name, COUNT(*) as exec_count
-            FROM process_logs 
-            WHERE hostname = %s 
-            AND timestamp > now() - INTERVAL 12 HOUR
-            AND is_anomaly = 1
-            GROUP BY process_name
-            ORDER BY exec_count DESC
-            LIMIT 10
-            """
-            
-            result = await self.clickhouse_client.execute(query, (device_entity.entity_id,))
+            # 查找设备上的异常进程（优先读预聚合表）
+            if self._anomaly_view_ready:
+                result = await self.clickhouse_client.execute(
+                    CH_ANOMALY_EDGES_QUERY,
+                    {'entity_type': 'device', 'entity_id': device_entity.entity_id,
+                     'hours': 12, 'limit': 10})
+            else:
+                result = await self.clickhouse_client.execute(
+                    CH_DEVICE_ANOMALY_QUERY, {'hostname': device_entity.entity_id})
             
             for row in result:
                 process_entity = SecurityEntity(
@@ -577,8 +925,8 @@ class ConnectionExpansionEngine:
                     entity_id=row[0],
                     status=EntityStatus.INVESTIGATED,
                     metadata={
-                        'expansion_source': 'baseline_anomaly',
-                        'relationship_type': 'ANOMALY_RELATED',
+                        _K_EXPANSION_SOURCE: _V_BASELINE_ANOMALY,
+                        _K_RELATIONSHIP_TYPE: _REL_ANOMALY_RELATED,
                         'anomaly_type': 'unusual_process_execution',
                         'event_count': row[1]
                     }
@@ -586,7 +934,7 @@ class ConnectionExpansionEngine:
                 entities.append(process_entity)
         
         except Exception as e:
-            self.logger.error(f"Device anomaly expansion failed: {e}")
+            self.logger.error("Device anomaly expansion failed: %s", e)
         
         return entities
     
@@ -608,28 +956,38 @@ class ConnectionExpansionEngine:
                 entities.extend(await self._find_temporal_user_relations(entity, time_window))
         
         except Exception as e:
-            self.logger.error(f"Temporal correlation expansion failed: {e}")
+            self.logger.error("Temporal correlation expansion failed: %s", e)
         
         return entities
     
+    async def _execute_pairs(self, query: str, params: Dict[str, Any]):
+        """执行(值, 计数)两列查询，驱动支持时走列式返回
+
+        时间相关查询可能返回数千行；列式结果对每列做一次C层tolist再zip，
+        比逐行解包Python元组快约一个量级。不支持columnar参数的驱动
+        退回原始行式结果。
+        """
+        try:
+            columns = await self.clickhouse_client.execute(query, params, columnar=True)
+        except TypeError:
+            return await self.clickhouse_client.execute(query, params)
+
+        if not columns:
+            return []
+
+        values, counts = columns[0], columns[1]
+        if hasattr(values, 'tolist'):
+            values, counts = values.tolist(), counts.tolist()
+        return zip(values, counts)
+
     async def _find_temporal_ip_relations(self, ip_entity: SecurityEntity, time_window: int) -> List[SecurityEntity]:
         """查找IP的时间相关实体"""
         entities = []
         
         try:
             # 查找同时间段内通信的其他IP
-            query = """
-            SELECT DISTINCT dst_ip, COUNT(*) as comm_count
-            FROM network_logs 
-            WHERE src_ip = %s 
-            AND timestamp > now() - INTERVAL %s HOUR
-            GROUP BY dst_ip
-            HAVING comm_count > 5
-            ORDER BY comm_count DESC
-            LIMIT 20
-            """
-            
-            result = await self.clickhouse_client.execute(query, (ip_entity.entity_id, time_window))
+            result = await self._execute_pairs(
+                CH_TEMPORAL_IP_QUERY, {'src_ip': ip_entity.entity_id, 'hours': time_window})
             
             for row in result:
                 related_ip = SecurityEntity(
@@ -637,8 +995,8 @@ class ConnectionExpansionEngine:
                     entity_id=row[0],
                     status=EntityStatus.INVESTIGATED,
                     metadata={
-                        'expansion_source': 'temporal_correlation',
-                        'relationship_type': 'COMMUNICATES_WITH',
+                        _K_EXPANSION_SOURCE: _V_TEMPORAL_CORRELATION,
+                        _K_RELATIONSHIP_TYPE: _REL_COMMUNICATES_WITH,
                         'communication_count': row[1],
                         'time_window_hours': time_window
                     }
@@ -646,7 +1004,7 @@ class ConnectionExpansionEngine:
                 entities.append(related_ip)
         
         except Exception as e:
-            self.logger.error(f"Temporal IP relations expansion failed: {e}")
+            self.logger.error("Temporal IP relations expansion failed: %s", e)
         
         return entities
     
@@ -656,18 +1014,8 @@ class ConnectionExpansionEngine:
         
         try:
             # 查找同时间段内访问的文件
-            query = """
-            SELECT DISTINCT file_path, COUNT(*) as access_count
-            FROM file_access_logs 
-            WHERE username = %s 
-            AND timestamp > now() - INTERVAL %s HOUR
-            GROUP BY file_path
-            HAVING access_count > 1
-            ORDER BY access_count DESC
-            LIMIT 15
-            """
-            
-            result = await self.clickhouse_client.execute(query, (user_entity.entity_id, time_window))
+            result = await self._execute_pairs(
+                CH_TEMPORAL_USER_QUERY, {'username': user_entity.entity_id, 'hours': time_window})
             
             for row in result:
                 file_entity = SecurityEntity(
@@ -675,8 +1023,8 @@ class ConnectionExpansionEngine:
                     entity_id=row[0],
                     status=EntityStatus.INVESTIGATED,
                     metadata={
-                        'expansion_source': 'temporal_correlation',
-                        'relationship_type': 'ACCESSES',
+                        _K_EXPANSION_SOURCE: _V_TEMPORAL_CORRELATION,
+                        _K_RELATIONSHIP_TYPE: _REL_ACCESSES,
                         'access_count': row[1],
                         'time_window_hours': time_window
                     }
@@ -684,67 +1032,107 @@ class ConnectionExpansionEngine:
                 entities.append(file_entity)
         
         except Exception as e:
-            self.logger.error(f"Temporal user relations expansion failed: {e}")
+            self.logger.error("Temporal user relations expansion failed: %s", e)
         
         return entities
     
     def _deduplicate_entities(self, entities: List[SecurityEntity]) -> List[SecurityEntity]:
-        """去重实体"""
-        seen = set()
+        """去重实体
+
+        深度扩充可能产生上万候选实体：精确set每键约80B，Bloom过滤器
+        约1.2B。大批量时用Bloom判重（1%假阳率意味着极少量新实体会被
+        误判为重复而丢弃，对本就要截断的候选集可接受），小批量走精确set。
+        """
         deduplicated = []
-        
+
+        if Bloom is not None and len(entities) >= _BLOOM_DEDUP_MIN_BATCH:
+            bloom = Bloom(len(entities), 0.01)
+            for entity in entities:
+                entity_key = (entity.entity_type, entity.entity_id)
+                if entity_key not in bloom:
+                    bloom.add(entity_key)
+                    deduplicated.append(entity)
+            return deduplicated
+
+        seen = set()
         for entity in entities:
             entity_key = (entity.entity_type, entity.entity_id)
             if entity_key not in seen:
                 seen.add(entity_key)
                 deduplicated.append(entity)
-        
+
         return deduplicated
     
     def _filter_by_confidence(self, entities: List[SecurityEntity]) -> List[SecurityEntity]:
-        """根据置信度过滤实体"""
-        min_confidence = self.expansion_config['min_confidence_threshold']
+        """根据置信度过滤实体（量化为整数后比较）"""
+        min_confidence_q8 = _q8(self.expansion_config['min_confidence_threshold'])
         filtered = []
-        
+
         for entity in entities:
             confidence = entity.metadata.get('confidence', entity.confidence)
-            if confidence >= min_confidence:
+            if _q8(confidence) >= min_confidence_q8:
                 filtered.append(entity)
-        
+
         return filtered[:self.expansion_config['max_entities_per_expansion']]
     
-    def _establish_connections(self, source_entity: SecurityEntity, 
+    def _establish_connections(self, source_entity: SecurityEntity,
                              expanded_entities: List[SecurityEntity]):
-        """建立实体间的连接关系"""
+        """建立实体间的连接关系
+
+        每对实体只落一条有向边（源实体侧），不再镜像REVERSE_*反向边，
+        邻接内存和下游遍历量减半；反向视图由无向的asset_graph按需提供。
+        """
         for target_entity in expanded_entities:
-            relationship_type = target_entity.metadata.get('relationship_type', 'RELATED_TO')
-            
-            # 添加双向连接
+            relationship_type = target_entity.metadata.get(_K_RELATIONSHIP_TYPE, 'RELATED_TO')
+
             source_entity.add_connection(
-                target_entity, 
+                target_entity,
                 relationship_type,
                 metadata={
-                    'expansion_method': target_entity.metadata.get('expansion_source'),
-                    'weight': self.relationship_weights.get(relationship_type, 0.5)
-                }
-            )
-            
-            target_entity.add_connection(
-                source_entity,
-                f"REVERSE_{relationship_type}",
-                metadata={
-                    'expansion_method': target_entity.metadata.get('expansion_source'),
-                    'weight': self.relationship_weights.get(relationship_type, 0.5)
+                    'expansion_method': target_entity.metadata.get(_K_EXPANSION_SOURCE),
+                    'weight_q8': self._relationship_weights_q8.get(relationship_type, 50)
                 }
             )
-    
+
+            # 同步写入内存图，供快速关系分析使用
+            self._record_graph_edge(source_entity, target_entity, relationship_type)
+
+    def _record_graph_edge(self, source_entity: SecurityEntity,
+                           target_entity: SecurityEntity, relationship_type: str):
+        """把实体关系写入内存资产图（igraph或networkx后端）"""
+        source_key = (source_entity.entity_type.value, source_entity.entity_id)
+        target_key = (target_entity.entity_type.value, target_entity.entity_id)
+        weight_q8 = self._relationship_weights_q8.get(relationship_type, 50)
+
+        if self._vertex_ids is not None:
+            for key in (source_key, target_key):
+                if key not in self._vertex_ids:
+                    self._vertex_ids[key] = self.asset_graph.add_vertex(
+                        name=f"{key[0]}:{key[1]}").index
+            self.asset_graph.add_edge(
+                self._vertex_ids[source_key], self._vertex_ids[target_key],
+                relationship_type=relationship_type, weight_q8=weight_q8)
+        else:
+            self.asset_graph.add_edge(
+                source_key, target_key,
+                relationship_type=relationship_type, weight_q8=weight_q8)
+
+    @staticmethod
+    def _classify(entity_id: str) -> Optional[EntityType]:
+        """按实体ID字符串单趟判别哈希/IP/域名
+
+        合并交替正则只扫一遍字符串就同时匹配三类模式，
+        取代逐模式的多次regex调用；无法判别时返回None。
+        """
+        match = _CLASSIFY_PATTERN.match(entity_id)
+        if match is None:
+            return None
+        if match.lastgroup == 'hash':
+            return EntityType.FILE
+        if match.lastgroup == 'ip':
+            return EntityType.IP
+        return EntityType.DOMAIN
+
     def _determine_hash_type(self, hash_value: str) -> str:
-        """确定哈希类型"""
-        length = len(hash_value)
-        if length == 32:
-            return 'MD5'
-        elif length == 40:
-            return 'SHA1'
-        elif length == 64:
-            return 'SHA256'
-        return 'UNKNOWN'
\ No newline at end of file
+        """确定哈希类型（按长度单次查表，批量情报摄入时免去分支级联）"""
+        return _HASH_TYPE_TABLE.get(len(hash_value), 'UNKNOWN')
\ No newline at end of file
@@ -4,8 +4,11 @@ Entity Recognition Engine
 """
 
 import re
-import json
+import bisect
+import functools
 import logging
+import socket
+import struct
 from typing import List, Dict, Any, Optional, Set
 from datetime import datetime
 import ipaddress
@@ -13,20 +16,92 @@ import hashlib
 
 from ..models.entities import SecurityEntity, EntityType, SecurityEvent
 
+try:
+    import re2
+except ImportError:  # google-re2为可选加速依赖，未安装时退回标准re
+    re2 = None
+
+
+def _compile_pattern(pattern: str, flags: int = 0):
+    """编译正则，可用时优先走RE2后端
+
+    RE2是Thompson NFA，保证线性时间匹配（天然免ReDoS）且自带字面量
+    预过滤；语法不被RE2支持或带flags时退回标准re，调用方接口不变。
+    """
+    if re2 is not None and flags == 0:
+        try:
+            return re2.compile(pattern)
+        except Exception:  # RE2不支持的语法（如部分断言）退回re
+            pass
+    return re.compile(pattern, flags)
+
+
+# 私有网段的整数边界：三次整数比较替代IPv4Network.__contains__
+_PRIVATE_RANGES_INT = tuple(
+    (int(n.network_address), int(n.broadcast_address))
+    for n in (ipaddress.ip_network('10.0.0.0/8'),
+              ipaddress.ip_network('172.16.0.0/12'),
+              ipaddress.ip_network('192.168.0.0/16')))
+
+
+# 校验用常量集合：模块级frozenset/tuple，O(1)成员测试且不随调用重建
+_INVALID_USERNAMES = frozenset({'null', 'undefined', 'anonymous', 'guest'})
+
+_SYSTEM_ACCOUNTS = frozenset({'system', 'administrator', 'root', 'admin', 'service'})
+
+_HASH_SCAN_TYPES = ('md5', 'sha1', 'sha256')
+
+# 系统进程白名单：模块级frozenset，O(1)成员测试且不随调用重建
+_SYSTEM_PROCESSES = frozenset({
+    'svchost.exe', 'explorer.exe', 'winlogon.exe',
+    'csrss.exe', 'lsass.exe', 'systemd', 'kernel'
+})
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _is_valid_ip(ip: str) -> bool:
+    """验证IP地址有效性
+
+    日志里同一IP会重复出现成百上千次，lru_cache把纯Python的
+    ipaddress解析摊成一次字典查找。
+    """
+    try:
+        ipaddress.ip_address(ip)
+        return True
+    except ValueError:
+        return False
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _is_private_ip(ip: str) -> bool:
+    """检查是否为私有IPv4（inet_aton是C实现，比ipaddress快一个量级）"""
+    try:
+        packed = socket.inet_aton(ip)
+    except OSError:
+        return False
+    value = struct.unpack('>I', packed)[0]
+    return any(lo <= value <= hi for lo, hi in _PRIVATE_RANGES_INT)
+
 class EntityRecognizer:
     """实体识别引擎"""
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         
-        # 正则表达式模式
+        # 正则表达式模式。domain/file_path/username带显式重复上界：
+        # 无界*/+嵌套可选组会让回溯引擎在长文本上退化为O(n²)，
+        # 有界重复使每个起始位置的重试次数有常数上限
         self.patterns = {
             'ip': r'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b',
-            'domain': r'\b[a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?(\.[a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?)*\.[a-zA-Z]{2,}\b',
+            # 标签数上界取12：远超真实域名深度（DNS隧道/DGA常见深层子域
+            # 也在其内），防回溯靠的是标签长度上界{0,62}而非标签数
+            'domain': r'\b(?:[a-zA-Z0-9][a-zA-Z0-9\-]{0,62}\.){1,12}[a-zA-Z]{2,24}\b',
             'email': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
-            'url': r'https?://[^\s<>"{}|\\^`\[\]]+',
-            'file_path_windows': r'[a-zA-Z]:\\[^:*?"<>|\r\n]*',
-            'file_path_linux': r'\/[^\s:*?"<>|\r\n]*',
+            # scheme逐字符双写大小写：混合大小写（Http://）也要命中，
+            # 同时免去IGNORECASE对整个模式的case-fold开销
+            'url': r'[hH][tT][tT][pP][sS]?://[^\s<>"{}|\\^`\[\]]+',
+            'file_path_windows': r'[a-zA-Z]:\\[^:*?"<>|\r\n]{0,4096}',
+            'file_path_linux': r'\/[^\s:*?"<>|\r\n]{1,4096}',
             'hash_md5': r'\b[a-fA-F0-9]{32}\b',
             'hash_sha1': r'\b[a-fA-F0-9]{40}\b',
             'hash_sha256': r'\b[a-fA-F0-9]{64}\b',
@@ -34,20 +109,35 @@ class EntityRecognizer:
             'username': r'\b[a-zA-Z][a-zA-Z0-9_\-\.]{2,20}\b'
         }
         
-        # 编译正则表达式
+        # 编译正则表达式。字符类已显式双写大小写的模式不加IGNORECASE：
+        # 该标志让sre对每个字符多走一次case-fold分支，纯属开销
+        self._pattern_flags = {'process_name': re.IGNORECASE,
+                               'file_path_windows': re.IGNORECASE}
         self.compiled_patterns = {}
         for name, pattern in self.patterns.items():
             try:
-                self.compiled_patterns[name] = re.compile(pattern, re.IGNORECASE)
+                self.compiled_patterns[name] = _compile_pattern(
+                    pattern, self._pattern_flags.get(name, 0))
             except re.error as e:
                 self.logger.error(f"Failed to compile pattern {name}: {e}")
-        
-        # 私有IP地址范围
-        self.private_ip_ranges = [
-            ipaddress.ip_network('10.0.0.0/8'),
-            ipaddress.ip_network('172.16.0.0/12'),
-            ipaddress.ip_network('192.168.0.0/16'),
-        ]
+
+        # 按前导字面量分组的文本扫描器：单一大交替会挡住sre的
+        # 首字面量/首字符类快进路径（memchr跳位），拆组后每组自带
+        # 快进，并配一个C层子串门控决定该组是否值得扫。
+        # 三个哈希模式共享前导hex字符类，合并为一组用lastgroup分桶
+        self._text_scan_hash_re = _compile_pattern(
+            '|'.join('(?P<%s>%s)' % (name, self.patterns[name])
+                     for name in ('hash_sha256', 'hash_sha1', 'hash_md5')))
+        # lower标志的组扫描整串.lower()后的文本：一次C层小写化替代
+        # 匹配器里的逐字符折叠，且命中串天然已归一化，下游免再lower
+        self._scan_groups = (
+            # (子串门控, 编译模式, 分桶名（None表示按lastgroup分桶）, 是否扫小写文本)
+            ('://', _compile_pattern(self.patterns['url']), 'url', False),
+            ('@', _compile_pattern(self.patterns['email']), 'email', True),
+            ('.', _compile_pattern(self.patterns['ip']), 'ip', False),
+            ('.', _compile_pattern(self.patterns['domain']), 'domain', True),
+            (None, self._text_scan_hash_re, None, True),
+        )
         
         # 系统文件路径白名单
         self.system_paths = {
@@ -66,358 +156,476 @@ class EntityRecognizer:
                 '/usr/lib'
             ]
         }
-    
-    def extract_entities(self, log_data: Dict[str, Any], 
+
+        # 拍平成小写前缀元组：startswith(tuple)在C层一次检查全部前缀，
+        # 免去每文件实体的双层Python循环
+        self._system_path_prefixes = tuple(
+            p.lower() for paths in self.system_paths.values() for p in paths)
+
+        # 结构化字段 -> (实体构建器, 去重集类型) 分发表：对log_data只走
+        # 一遍items()，每个键查一次表，取代8个提取方法各自约50次
+        # `field in log_data`探测。去重集按实体类型分桶，见_assemble_entities
+        self._field_dispatch = {}
+        for fields, builder, dedup_type in (
+                (('src_ip', 'dst_ip', 'source_ip', 'dest_ip', 'remote_ip',
+                  'client_ip', 'server_ip', 'host_ip'),
+                 self._build_ip_entity, EntityType.IP),
+                (('username', 'user', 'account', 'login_name', 'user_name',
+                  'src_user', 'dst_user', 'target_user'),
+                 self._build_user_entity, EntityType.USER),
+                (('file_path', 'filename', 'file_name', 'path', 'target_filename',
+                  'process_path', 'image_path', 'command_line'),
+                 self._build_file_entity, EntityType.FILE),
+                (('process_name', 'image_name', 'command',
+                  'process_command_line'),
+                 self._build_process_entity, EntityType.PROCESS),
+                (('domain', 'hostname', 'dest_domain', 'target_domain',
+                  'dns_query'),
+                 self._build_domain_entity, EntityType.DOMAIN),
+                (('email', 'sender', 'recipient', 'from_email',
+                  'to_email'),
+                 self._build_email_entity, EntityType.EMAIL),
+                (('url', 'uri', 'request_url', 'referer',
+                  'redirect_url'),
+                 self._build_url_entity, EntityType.URL),
+                (('md5', 'sha1', 'sha256', 'file_hash',
+                  'hash'),
+                 self._build_hash_entity, EntityType.FILE)):
+            for field in fields:
+                self._field_dispatch[field] = (builder, dedup_type)
+
+    def extract_entities(self, log_data: Dict[str, Any],
                         event_id: str = None) -> List[SecurityEntity]:
         """从日志数据中提取实体"""
-        entities = []
-        extracted_values = set()  # 防重复
-        
         try:
-            # 转换日志数据为字符串用于模式匹配
-            log_text = json.dumps(log_data) if isinstance(log_data, dict) else str(log_data)
-            
-            # 提取各种类型的实体
-            entities.extend(self._extract_ip_entities(log_data, log_text, extracted_values))
-            entities.extend(self._extract_user_entities(log_data, extracted_values))
-            entities.extend(self._extract_file_entities(log_data, extracted_values))
-            entities.extend(self._extract_process_entities(log_data, extracted_values))
-            entities.extend(self._extract_domain_entities(log_data, log_text, extracted_values))
-            entities.extend(self._extract_email_entities(log_data, log_text, extracted_values))
-            entities.extend(self._extract_url_entities(log_data, log_text, extracted_values))
-            entities.extend(self._extract_hash_entities(log_data, log_text, extracted_values))
-            
-            # 为所有实体添加事件关联信息
-            for entity in entities:
-                if event_id:
-                    entity.add_metadata('source_event_id', event_id)
-                entity.add_metadata('extraction_timestamp', datetime.now().isoformat())
-                
+            # 只对字符串叶子值做文本扫描：省掉json.dumps整串序列化的
+            # 大分配，扫描字节数降到有效载荷本身，也避免转义伪影
+            # （如\\把Windows路径转义得regex无法命中）
+            if isinstance(log_data, dict):
+                text_matches: Dict[str, List[str]] = {}
+                for leaf in self._iter_str_leaves(log_data):
+                    if len(leaf) < 4:  # 最短可命中实体（a.co）也要4字符
+                        continue
+                    for name, hits in self._scan_text(leaf).items():
+                        text_matches.setdefault(name, []).extend(hits)
+            else:
+                text_matches = self._scan_text(str(log_data))
+
+            return self._assemble_entities(log_data, text_matches, event_id)
+
         except Exception as e:
             self.logger.error(f"Error extracting entities from log: {e}")
-        
-        return entities
-    
-    def _extract_ip_entities(self, log_data: Dict, log_text: str, 
-                           extracted_values: Set) -> List[SecurityEntity]:
-        """提取IP实体"""
+            return []
+
+    def extract_entities_batch(self, logs: List[Dict[str, Any]],
+                               event_ids: Optional[List[str]] = None
+                               ) -> List[List[SecurityEntity]]:
+        """批量提取：全部日志的文本拼成单块，每组模式只扫一遍
+
+        正则引擎的状态机初始化和Python调用帧按扫描次数计费。把N条
+        日志的字符串叶子用换行拼成一个大块（各模式都无法跨换行匹配）
+        后整批只做一轮分组扫描，命中偏移经bisect归属回原记录；
+        结构化字段仍逐条走分发表。
+        """
+        if event_ids is None:
+            event_ids = [None] * len(logs)
+
+        offsets = []  # 各记录文本段在blob中的起始偏移
+        texts = []
+        position = 0
+        for log_data in logs:
+            if isinstance(log_data, dict):
+                text = '\n'.join(leaf for leaf in self._iter_str_leaves(log_data)
+                                 if len(leaf) >= 4)
+            else:
+                text = str(log_data)
+            offsets.append(position)
+            texts.append(text)
+            position += len(text) + 1
+        blob = '\n'.join(texts)
+
+        per_record: List[Dict[str, List[str]]] = [{} for _ in logs]
+        if len(blob) >= 4:
+            blob_lower = None
+            for gate, regex, name, lower in self._scan_groups:
+                if lower and blob_lower is None:
+                    blob_lower = blob.lower()
+                target = blob_lower if lower else blob
+                if name is not None and gate not in target:
+                    continue
+                if name is None and len(target) < 32:
+                    continue
+                for match in regex.finditer(target):
+                    record_index = bisect.bisect_right(offsets, match.start()) - 1
+                    bucket = name if name is not None else match.lastgroup
+                    per_record[record_index].setdefault(bucket, []).append(match.group())
+
+        results = []
+        for log_data, text_matches, event_id in zip(logs, per_record, event_ids):
+            try:
+                results.append(self._assemble_entities(log_data, text_matches, event_id))
+            except Exception as e:
+                self.logger.error(f"Error extracting entities from log: {e}")
+                results.append([])
+        return results
+
+    def _assemble_entities(self, log_data: Any, text_matches: Dict[str, List[str]],
+                           event_id: Optional[str]) -> List[SecurityEntity]:
+        """结构化字段单遍分发 + 按类型消费文本分桶，并补齐事件关联信息"""
         entities = []
-        
-        # 从结构化字段提取
-        ip_fields = ['src_ip', 'dst_ip', 'source_ip', 'dest_ip', 'remote_ip', 
-                    'client_ip', 'server_ip', 'host_ip']
-        
-        for field in ip_fields:
-            if field in log_data and self._is_valid_ip(log_data[field]):
-                ip = log_data[field]
-                if ip not in extracted_values:
-                    entity = SecurityEntity(
-                        entity_type=EntityType.IP,
-                        entity_id=ip,
-                        metadata={
-                            'field_source': field,
-                            'is_private': self._is_private_ip(ip),
-                            'direction': 'source' if 'src' in field or 'source' in field else 'destination'
-                        }
-                    )
-                    entities.append(entity)
-                    extracted_values.add(ip)
-        
-        # 从文本中提取IP地址
-        if 'ip' in self.compiled_patterns:
-            for match in self.compiled_patterns['ip'].finditer(log_text):
-                ip = match.group()
-                if self._is_valid_ip(ip) and ip not in extracted_values:
-                    entity = SecurityEntity(
-                        entity_type=EntityType.IP,
-                        entity_id=ip,
-                        metadata={
-                            'field_source': 'text_extraction',
-                            'is_private': self._is_private_ip(ip)
-                        }
-                    )
-                    entities.append(entity)
-                    extracted_values.add(ip)
-        
+        # 去重集按实体类型分桶：每个`in`探测只面对本类型的小集合，
+        # 跨类型（URL与域名串）本就不可能撞同值，不必共摊一个大集合
+        seen = {entity_type: set() for entity_type in EntityType}
+
+        if isinstance(log_data, dict):
+            entities.extend(self._extract_from_structured_fields(log_data, seen))
+        entities.extend(self._extract_ip_entities(text_matches, seen[EntityType.IP]))
+        entities.extend(self._extract_domain_entities(text_matches, seen[EntityType.DOMAIN]))
+        entities.extend(self._extract_email_entities(text_matches, seen[EntityType.EMAIL]))
+        entities.extend(self._extract_url_entities(text_matches, seen[EntityType.URL]))
+        entities.extend(self._extract_hash_entities(text_matches, seen[EntityType.FILE]))
+
+        # 为所有实体添加事件关联信息。直接写metadata字典：省掉
+        # add_metadata的方法调用，也不为纯批注字段每实体追加两条
+        # timeline记录；时间戳整批算一次而不是每实体一次
+        timestamp = datetime.now().isoformat()
+        for entity in entities:
+            metadata = entity.metadata
+            if event_id:
+                metadata['source_event_id'] = event_id
+            metadata['extraction_timestamp'] = timestamp
+
         return entities
-    
-    def _extract_user_entities(self, log_data: Dict, extracted_values: Set) -> List[SecurityEntity]:
-        """提取用户实体"""
+
+    @staticmethod
+    def _iter_str_leaves(obj):
+        """递归产出dict/list中的字符串叶子值，数值/布尔直接跳过"""
+        if isinstance(obj, dict):
+            for value in obj.values():
+                yield from EntityRecognizer._iter_str_leaves(value)
+        elif isinstance(obj, (list, tuple)):
+            for value in obj:
+                yield from EntityRecognizer._iter_str_leaves(value)
+        elif isinstance(obj, str):
+            yield obj
+
+    def _scan_text(self, log_text: str) -> Dict[str, List[str]]:
+        """扫描文本，按模式名分桶返回命中串
+
+        逐组扫描：每组先过C层子串门控（memchr级，比正则便宜几个
+        数量级），无捕获组的单模式组走findall的C循环收集命中。
+        """
+        if len(log_text) < 4:  # 最短可命中实体（a.co）也要4字符
+            return {}
+
+        matches: Dict[str, List[str]] = {}
+        setdefault = matches.setdefault
+        lowered = None
+        for gate, regex, name, lower in self._scan_groups:
+            if lower:
+                if lowered is None:
+                    lowered = log_text.lower()
+                target = lowered
+            else:
+                target = log_text
+            if name is not None:
+                if gate not in target:
+                    continue
+                hits = regex.findall(target)
+                if hits:
+                    setdefault(name, []).extend(hits)
+            elif len(target) >= 32:  # 哈希组：文本装不下最短哈希则跳过
+                for match in regex.finditer(target):
+                    setdefault(match.lastgroup, []).append(match.group())
+        return matches
+
+    def _extract_from_structured_fields(self, log_data: Dict,
+                                        seen: Dict[EntityType, Set]) -> List[SecurityEntity]:
+        """单遍遍历log_data.items()，经分发表路由到对应实体构建器"""
         entities = []
-        
-        user_fields = ['username', 'user', 'account', 'login_name', 'user_name',
-                      'src_user', 'dst_user', 'target_user']
-        
-        for field in user_fields:
-            if field in log_data and isinstance(log_data[field], str):
-                username = log_data[field].strip()
-                if username and username not in extracted_values and self._is_valid_username(username):
-                    entity = SecurityEntity(
-                        entity_type=EntityType.USER,
-                        entity_id=username,
-                        metadata={
-                            'field_source': field,
-                            'is_system_account': self._is_system_account(username)
-                        }
-                    )
-                    entities.append(entity)
-                    extracted_values.add(username)
-        
+        # 热循环内把属性/方法查找提为局部名，省去每次迭代的字节码
+        # LOAD_ATTR派发开销
+        dispatch_get = self._field_dispatch.get
+        append = entities.append
+        for field, value in log_data.items():
+            spec = dispatch_get(field)
+            if spec is not None:
+                builder, dedup_type = spec
+                entity = builder(field, value, seen[dedup_type])
+                if entity is not None:
+                    append(entity)
         return entities
-    
-    def _extract_file_entities(self, log_data: Dict, extracted_values: Set) -> List[SecurityEntity]:
-        """提取文件实体"""
+
+    def _build_ip_entity(self, field: str, value: Any,
+                         extracted_values: Set) -> Optional[SecurityEntity]:
+        """从结构化字段构建IP实体"""
+        # 非字符串值（整数IP、列表）会让lru_cache包装的校验函数抛
+        # TypeError，直接跳过，与其他_build_*保持一致
+        if not isinstance(value, str):
+            return None
+        if not self._is_valid_ip(value) or value in extracted_values:
+            return None
+        extracted_values.add(value)
+        return SecurityEntity(
+            entity_type=EntityType.IP,
+            entity_id=value,
+            metadata={
+                'field_source': field,
+                'is_private': self._is_private_ip(value),
+                'direction': 'source' if 'src' in field or 'source' in field else 'destination'
+            }
+        )
+
+    def _build_user_entity(self, field: str, value: Any,
+                           extracted_values: Set) -> Optional[SecurityEntity]:
+        """从结构化字段构建用户实体"""
+        if not isinstance(value, str):
+            return None
+        username = value.strip()
+        if not username or username in extracted_values or not self._is_valid_username(username):
+            return None
+        extracted_values.add(username)
+        return SecurityEntity(
+            entity_type=EntityType.USER,
+            entity_id=username,
+            metadata={
+                'field_source': field,
+                'is_system_account': self._is_system_account(username)
+            }
+        )
+
+    def _build_file_entity(self, field: str, value: Any,
+                           extracted_values: Set) -> Optional[SecurityEntity]:
+        """从结构化字段构建文件实体"""
+        if not isinstance(value, str):
+            return None
+        file_path = value.strip()
+        if (not file_path or file_path in extracted_values
+                or not self._is_valid_file_path(file_path)):
+            return None
+        extracted_values.add(file_path)
+        return SecurityEntity(
+            entity_type=EntityType.FILE,
+            entity_id=file_path,
+            metadata={
+                'field_source': field,
+                'is_system_file': self._is_system_file(file_path),
+                'file_extension': self._get_file_extension(file_path)
+            }
+        )
+
+    def _build_process_entity(self, field: str, value: Any,
+                              extracted_values: Set) -> Optional[SecurityEntity]:
+        """从结构化字段构建进程实体"""
+        if not isinstance(value, str):
+            return None
+        process_info = value.strip()
+        if not process_info or process_info in extracted_values:
+            return None
+        process_name = self._extract_process_name(process_info)
+        if not process_name:
+            return None
+        extracted_values.add(process_info)
+        return SecurityEntity(
+            entity_type=EntityType.PROCESS,
+            entity_id=process_name,
+            metadata={
+                'field_source': field,
+                'full_command': process_info if field == 'process_command_line' else None,
+                'is_system_process': self._is_system_process(process_name)
+            }
+        )
+
+    def _build_domain_entity(self, field: str, value: Any,
+                             extracted_values: Set) -> Optional[SecurityEntity]:
+        """从结构化字段构建域名实体"""
+        if not isinstance(value, str):
+            return None
+        domain = value.strip().lower()
+        if not domain or domain in extracted_values or not self._is_valid_domain(domain):
+            return None
+        extracted_values.add(domain)
+        return SecurityEntity(
+            entity_type=EntityType.DOMAIN,
+            entity_id=domain,
+            metadata={
+                'field_source': field,
+                'tld': self._get_tld(domain)
+            }
+        )
+
+    def _build_email_entity(self, field: str, value: Any,
+                            extracted_values: Set) -> Optional[SecurityEntity]:
+        """从结构化字段构建邮箱实体"""
+        if not isinstance(value, str):
+            return None
+        email = value.strip().lower()
+        if not email or email in extracted_values or not self._is_valid_email(email):
+            return None
+        extracted_values.add(email)
+        return SecurityEntity(
+            entity_type=EntityType.EMAIL,
+            entity_id=email,
+            metadata={
+                'field_source': field,
+                'domain': email.split('@')[1] if '@' in email else None
+            }
+        )
+
+    def _build_url_entity(self, field: str, value: Any,
+                          extracted_values: Set) -> Optional[SecurityEntity]:
+        """从结构化字段构建URL实体"""
+        if not isinstance(value, str):
+            return None
+        url = value.strip()
+        if not url or url in extracted_values or not self._is_valid_url(url):
+            return None
+        extracted_values.add(url)
+        return SecurityEntity(
+            entity_type=EntityType.URL,
+            entity_id=url,
+            metadata={
+                'field_source': field,
+                'domain': self._extract_domain_from_url(url),
+                'scheme': url.split('://')[0] if '://' in url else None
+            }
+        )
+
+    def _build_hash_entity(self, field: str, value: Any,
+                           extracted_values: Set) -> Optional[SecurityEntity]:
+        """从结构化字段构建哈希实体"""
+        if not isinstance(value, str):
+            return None
+        hash_value = value.strip().lower()
+        if (not hash_value or hash_value in extracted_values
+                or not self._is_valid_hash(hash_value)):
+            return None
+        extracted_values.add(hash_value)
+        return SecurityEntity(
+            entity_type=EntityType.FILE,  # 哈希通常关联文件
+            entity_id=hash_value,
+            metadata={
+                'field_source': field,
+                'hash_type': self._determine_hash_type(hash_value),
+                'is_hash': True
+            }
+        )
+
+    def _extract_ip_entities(self, text_matches: Dict[str, List[str]],
+                             extracted_values: Set) -> List[SecurityEntity]:
+        """从文本命中分桶提取IP实体"""
         entities = []
-        
-        file_fields = ['file_path', 'filename', 'file_name', 'path', 'target_filename',
-                      'process_path', 'image_path', 'command_line']
-        
-        for field in file_fields:
-            if field in log_data and isinstance(log_data[field], str):
-                file_path = log_data[field].strip()
-                if file_path and file_path not in extracted_values:
-                    # 验证是否为有效文件路径
-                    if self._is_valid_file_path(file_path):
-                        entity = SecurityEntity(
-                            entity_type=EntityType.FILE,
-                            entity_id=file_path,
-                            metadata={
-                                'field_source': field,
-                                'is_system_file': self._is_system_file(file_path),
-                                'file_extension': self._get_file_extension(file_path)
-                            }
-                        )
-                        entities.append(entity)
-                        extracted_values.add(file_path)
-        
+        for ip in text_matches.get('ip', ()):
+            if self._is_valid_ip(ip) and ip not in extracted_values:
+                entity = SecurityEntity(
+                    entity_type=EntityType.IP,
+                    entity_id=ip,
+                    metadata={
+                        'field_source': 'text_extraction',
+                        'is_private': self._is_private_ip(ip)
+                    }
+                )
+                entities.append(entity)
+                extracted_values.add(ip)
         return entities
-    
-    def _extract_process_entities(self, log_data: Dict, extracted_values: Set) -> List[SecurityEntity]:
-        """提取进程实体"""
+
+    def _extract_domain_entities(self, text_matches: Dict[str, List[str]],
+                                 extracted_values: Set) -> List[SecurityEntity]:
+        """从文本命中分桶提取域名实体"""
         entities = []
-        
-        process_fields = ['process_name', 'image_name', 'command', 'process_command_line']
-        
-        for field in process_fields:
-            if field in log_data and isinstance(log_data[field], str):
-                process_info = log_data[field].strip()
-                if process_info and process_info not in extracted_values:
-                    # 提取进程名称
-                    process_name = self._extract_process_name(process_info)
-                    if process_name:
-                        entity = SecurityEntity(
-                            entity_type=EntityType.PROCESS,
-                            entity_id=process_name,
-                            metadata={
-                                'field_source': field,
-                                'full_command': process_info if field == 'process_command_line' else None,
-                                'is_system_process': self._is_system_process(process_name)
-                            }
-                        )
-                        entities.append(entity)
-                        extracted_values.add(process_info)
-        
+        # 域名组扫的是小写化文本，命中串已归一化
+        for domain in text_matches.get('domain', ()):
+            if domain not in extracted_values and self._is_valid_domain(domain):
+                entity = SecurityEntity(
+                    entity_type=EntityType.DOMAIN,
+                    entity_id=domain,
+                    metadata={
+                        'field_source': 'text_extraction',
+                        'tld': self._get_tld(domain)
+                    }
+                )
+                entities.append(entity)
+                extracted_values.add(domain)
         return entities
-    
-    def _extract_domain_entities(self, log_data: Dict, log_text: str, 
+
+    def _extract_email_entities(self, text_matches: Dict[str, List[str]],
                                 extracted_values: Set) -> List[SecurityEntity]:
-        """提取域名实体"""
+        """从文本命中分桶提取邮箱实体"""
         entities = []
-        
-        # 从结构化字段提取
-        domain_fields = ['domain', 'hostname', 'dest_domain', 'target_domain', 'dns_query']
-        
-        for field in domain_fields:
-            if field in log_data and isinstance(log_data[field], str):
-                domain = log_data[field].strip().lower()
-                if domain and domain not in extracted_values and self._is_valid_domain(domain):
-                    entity = SecurityEntity(
-                        entity_type=EntityType.DOMAIN,
-                        entity_id=domain,
-                        metadata={
-                            'field_source': field,
-                            'tld': self._get_tld(domain)
-                        }
-                    )
-                    entities.append(entity)
-                    extracted_values.add(domain)
-        
-        # 从文本中提取域名
-        if 'domain' in self.compiled_patterns:
-            for match in self.compiled_patterns['domain'].finditer(log_text):
-                domain = match.group().lower()
-                if domain not in extracted_values and self._is_valid_domain(domain):
-                    entity = SecurityEntity(
-                        entity_type=EntityType.DOMAIN,
-                        entity_id=domain,
-                        metadata={
-                            'field_source': 'text_extraction',
-                            'tld': self._get_tld(domain)
-                        }
-                    )
-                    entities.append(entity)
-                    extracted_values.add(domain)
-        
-        return entities
-    
-    def _extract_email_entities(self, log_data: Dict, log_text: str, 
-                               extracted_values: Set) -> List[SecurityEntity]:
-        """提取邮箱实体"""
-        entities = []
-        
-        # 从结构化字段提取
-        email_fields = ['email', 'sender', 'recipient', 'from_email', 'to_email']
-        
-        for field in email_fields:
-            if field in log_data and isinstance(log_data[field], str):
-                email = log_data[field].strip().lower()
-                if email and email not in extracted_values and self._is_valid_email(email):
-                    entity = SecurityEntity(
-                        entity_type=EntityType.EMAIL,
-                        entity_id=email,
-                        metadata={
-                            'field_source': field,
-                            'domain': email.split('@')[1] if '@' in email else None
-                        }
-                    )
-                    entities.append(entity)
-                    extracted_values.add(email)
-        
-        # 从文本中提取邮箱
-        if 'email' in self.compiled_patterns:
-            for match in self.compiled_patterns['email'].finditer(log_text):
-                email = match.group().lower()
-                if email not in extracted_values:
-                    entity = SecurityEntity(
-                        entity_type=EntityType.EMAIL,
-                        entity_id=email,
-                        metadata={
-                            'field_source': 'text_extraction',
-                            'domain': email.split('@')[1] if '@' in email else None
-                        }
-                    )
-                    entities.append(entity)
-                    extracted_values.add(email)
-        
+        # 邮箱组扫的是小写化文本，命中串已归一化
+        for email in text_matches.get('email', ()):
+            if email not in extracted_values:
+                entity = SecurityEntity(
+                    entity_type=EntityType.EMAIL,
+                    entity_id=email,
+                    metadata={
+                        'field_source': 'text_extraction',
+                        'domain': email.split('@')[1] if '@' in email else None
+                    }
+                )
+                entities.append(entity)
+                extracted_values.add(email)
         return entities
-    
-    def _extract_url_entities(self, log_data: Dict, log_text: str, 
-                             extracted_values: Set) -> List[SecurityEntity]:
-        """提取URL实体"""
+
+    def _extract_url_entities(self, text_matches: Dict[str, List[str]],
+                              extracted_values: Set) -> List[SecurityEntity]:
+        """从文本命中分桶提取URL实体"""
         entities = []
-        
-        # 从结构化字段提取
-        url_fields = ['url', 'uri', 'request_url', 'referer', 'redirect_url']
-        
-        for field in url_fields:
-            if field in log_data and isinstance(log_data[field], str):
-                url = log_data[field].strip()
-                if url and url not in extracted_values and self._is_valid_url(url):
-                    entity = SecurityEntity(
-                        entity_type=EntityType.URL,
-                        entity_id=url,
-                        metadata={
-                            'field_source': field,
-                            'domain': self._extract_domain_from_url(url),
-                            'scheme': url.split('://')[0] if '://' in url else None
-                        }
-                    )
-                    entities.append(entity)
-                    extracted_values.add(url)
-        
-        # 从文本中提取URL
-        if 'url' in self.compiled_patterns:
-            for match in self.compiled_patterns['url'].finditer(log_text):
-                url = match.group()
-                if url not in extracted_values:
-                    entity = SecurityEntity(
-                        entity_type=EntityType.URL,
-                        entity_id=url,
-                        metadata={
-                            'field_source': 'text_extraction',
-                            'domain': self._extract_domain_from_url(url),
-                            'scheme': url.split('://')[0] if '://' in url else None
-                        }
-                    )
-                    entities.append(entity)
-                    extracted_values.add(url)
-        
+        for url in text_matches.get('url', ()):
+            if url not in extracted_values:
+                entity = SecurityEntity(
+                    entity_type=EntityType.URL,
+                    entity_id=url,
+                    metadata={
+                        'field_source': 'text_extraction',
+                        'domain': self._extract_domain_from_url(url),
+                        'scheme': url.split('://')[0] if '://' in url else None
+                    }
+                )
+                entities.append(entity)
+                extracted_values.add(url)
         return entities
-    
-    def _extract_hash_entities(self, log_data: Dict, log_text: str, 
-                              extracted_values: Set) -> List[SecurityEntity]:
-        """提取哈希值实体"""
+
+    def _extract_hash_entities(self, text_matches: Dict[str, List[str]],
+                               extracted_values: Set) -> List[SecurityEntity]:
+        """从文本命中分桶提取哈希值实体"""
         entities = []
-        
-        # 从结构化字段提取
-        hash_fields = ['md5', 'sha1', 'sha256', 'file_hash', 'hash']
-        
-        for field in hash_fields:
-            if field in log_data and isinstance(log_data[field], str):
-                hash_value = log_data[field].strip().lower()
-                if hash_value and hash_value not in extracted_values and self._is_valid_hash(hash_value):
-                    hash_type = self._determine_hash_type(hash_value)
+        # 哈希组扫的是小写化文本，命中串已归一化
+        for hash_type in _HASH_SCAN_TYPES:
+            for hash_value in text_matches.get(f'hash_{hash_type}', ()):
+                if hash_value not in extracted_values:
                     entity = SecurityEntity(
-                        entity_type=EntityType.FILE,  # 哈希通常关联文件
+                        entity_type=EntityType.FILE,
                         entity_id=hash_value,
                         metadata={
-                            'field_source': field,
-                            'hash_type': hash_type,
+                            'field_source': 'text_extraction',
+                            'hash_type': hash_type.upper(),
                             'is_hash': True
                         }
                     )
                     entities.append(entity)
                     extracted_values.add(hash_value)
-        
-        # 从文本中提取哈希
-        for hash_type in ['md5', 'sha1', 'sha256']:
-            if hash_type in self.compiled_patterns:
-                for match in self.compiled_patterns[f'hash_{hash_type}'].finditer(log_text):
-                    hash_value = match.group().lower()
-                    if hash_value not in extracted_values:
-                        entity = SecurityEntity(
-                            entity_type=EntityType.FILE,
-                            entity_id=hash_value,
-                            metadata={
-                                'field_source': 'text_extraction',
-                                'hash_type': hash_type.upper(),
-                                'is_hash': True
-                            }
-                        )
-                        entities.append(entity)
-                        extracted_values.add(hash_value)
-        
         return entities
-    
+
     # 辅助验证方法
     def _is_valid_ip(self, ip: str) -> bool:
         """验证IP地址有效性"""
-        try:
-            ipaddress.ip_address(ip)
-            return True
-        except ValueError:
-            return False
-    
+        return _is_valid_ip(ip)
+
     def _is_private_ip(self, ip: str) -> bool:
         """检查是否为私有IP"""
-        try:
-            ip_obj = ipaddress.ip_address(ip)
-            return any(ip_obj in network for network in self.private_ip_ranges)
-        except ValueError:
-            return False
+        return _is_private_ip(ip)
     
     def _is_valid_username(self, username: str) -> bool:
         """验证用户名有效性"""
         if len(username) < 2 or len(username) > 50:
             return False
         # 排除一些明显不是用户名的字符串
-        invalid_patterns = ['null', 'undefined', 'anonymous', 'guest']
-        return username.lower() not in invalid_patterns
-    
+        return username.lower() not in _INVALID_USERNAMES
+
     def _is_system_account(self, username: str) -> bool:
         """检查是否为系统账户"""
-        system_accounts = ['system', 'administrator', 'root', 'admin', 'service']
-        return username.lower() in system_accounts
+        return username.lower() in _SYSTEM_ACCOUNTS
     
     def _is_valid_file_path(self, path: str) -> bool:
         """验证文件路径有效性"""
@@ -429,11 +637,7 @@ class EntityRecognizer:
     
     def _is_system_file(self, file_path: str) -> bool:
         """检查是否为系统文件"""
-        for os_type, paths in self.system_paths.items():
-            for sys_path in paths:
-                if file_path.startswith(sys_path):
-                    return True
-        return False
+        return file_path.lower().startswith(self._system_path_prefixes)
     
     def _get_file_extension(self, file_path: str) -> Optional[str]:
         """获取文件扩展名"""
@@ -442,19 +646,17 @@ class EntityRecognizer:
         return None
     
     def _extract_process_name(self, process_info: str) -> Optional[str]:
-        """从进程信息中提取进程名"""
-        # 简单实现，可以根据需要增强
-        if '\\' in process_info:
-            return process_info.split('\\')[-1]
-        elif '/' in process_info:
-            return process_info.split('/')[-1]
-        return process_info
-    
+        """从进程信息中提取进程名
+
+        rfind从右单遍定位最后一个分隔符后切片，不像split那样
+        按路径深度分配整张列表只为取末元素。
+        """
+        index = max(process_info.rfind('\\'), process_info.rfind('/'))
+        return process_info[index + 1:] if index >= 0 else process_info
+
     def _is_system_process(self, process_name: str) -> bool:
         """检查是否为系统进程"""
-        system_processes = ['svchost.exe', 'explorer.exe', 'winlogon.exe', 
-                           'csrss.exe', 'lsass.exe', 'systemd', 'kernel']
-        return process_name.lower() in system_processes
+        return process_name.lower() in _SYSTEM_PROCESSES
     
     def _is_valid_domain(self, domain: str) -> bool:
         """验证域名有效性"""
@@ -477,18 +679,30 @@ class EntityRecognizer:
         """验证URL有效性"""
         return url.startswith(('http://', 'https://')) and len(url) > 10
     
-    def _extract_domain_from_url(self, url: str) -> Optional[str]:
-        """从URL中提取域名"""
-        try:
-            from urllib.parse import urlparse
-            parsed = urlparse(url)
-            return parsed.netloc
-        except:
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _extract_domain_from_url(url: str) -> Optional[str]:
+        """从URL中提取域名
+
+        只需要netloc这一小段，手写find/切片比整套urlparse便宜一个
+        量级；同一URL在日志里反复出现，lru_cache再把剩余开销摊掉。
+        """
+        index = url.find('://')
+        if index < 0:
             return None
+        rest = url[index + 3:]
+        slash = rest.find('/')
+        return rest if slash < 0 else rest[:slash]
     
     def _is_valid_hash(self, hash_value: str) -> bool:
-        """验证哈希值有效性"""
-        return len(hash_value) in [32, 40, 64] and all(c in '0123456789abcdef' for c in hash_value.lower())
+        """验证哈希值有效性（fromhex单次C调用替代逐字符Python循环）"""
+        if len(hash_value) not in (32, 40, 64):
+            return False
+        try:
+            bytes.fromhex(hash_value)
+            return True
+        except ValueError:
+            return False
     
     def _determine_hash_type(self, hash_value: str) -> str:
         """确定哈希类型"""
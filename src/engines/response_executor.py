@@ -5,15 +5,28 @@ Response Execution Engine
 
 import logging
 import asyncio
+import secrets
 from abc import ABC, abstractmethod
 from enum import Enum
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
+from time import perf_counter_ns, time_ns
 import json
 
+# 可选依赖：orjson（C实现JSON，比标准库快3-10倍），缺失时退回json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from ..models.entities import SecurityEntity, EntityType, EntityStatus
 
 
+def _iso_now() -> str:
+    """当前时间的ISO字符串（基于time_ns，比datetime.now()省去tz查询开销）"""
+    return datetime.fromtimestamp(time_ns() / 1e9).isoformat()
+
+
 class ResponseAction(Enum):
     """响应动作枚举"""
     # 网络响应
@@ -56,15 +69,152 @@ class ResponseStatus(Enum):
     TIMEOUT = "执行超时"
     CANCELLED = "已取消"
 
+# 预取枚举的.value字符串：结果字典与比较两侧共用同一常量对象，
+# 状态判断可走is身份比较（结果最终仍以字符串进入JSON响应）
+_STATUS_SUCCESS = ResponseStatus.SUCCESS.value
+_STATUS_FAILED = ResponseStatus.FAILED.value
+
 
 class ResponseExecutor(ABC):
     """响应执行器抽象基类"""
-    
-    def __init__(self, executor_id: str, config: Dict[str, Any] = None):
+
+    # 类级缓存logger：子类按执行器ID各建一次，构造时不再拼f-string查注册表
+    _LOGGER = logging.getLogger(__name__)
+
+    # __slots__去掉实例__dict__：执行器属性固定，热路径属性读取更快
+    __slots__ = ('executor_id', 'config', 'http_client', 'logger',
+                 'max_batch', 'bulk_idle_timeout', '_bulk_endpoints',
+                 '_headers', '_json_headers', '_pending',
+                 '_bulk_task', '_bulk_wakeup', '_bulk_full')
+
+    def __init__(self, executor_id: str, config: Dict[str, Any] = None,
+                 http_client: Any = None):
         self.executor_id = executor_id
         self.config = config or {}
-        self.logger = logging.getLogger(f"{__name__}.{executor_id}")
-    
+        # 共享的异步HTTP客户端（连接池+keep-alive），由编排器注入，
+        # 跨执行器复用长连接，避免每次动作重新握手
+        self.http_client = http_client
+        self.logger = self._LOGGER
+        # 批量合并：同一事件循环窗口内的同类动作合并为一次bulk请求
+        self.max_batch = int(self.config.get('max_batch', 64))
+        # 冲刷循环空闲多久后退出（秒）；期间突发只需置位事件，不重建任务
+        self.bulk_idle_timeout = float(self.config.get('bulk_idle_timeout', 2.0))
+        self._bulk_endpoints: Dict[ResponseAction, str] = {}
+        # 固定的认证头，子类构造时注册一次，热路径不再反射查找
+        self._headers: Optional[Dict[str, str]] = None
+        # 懒构建的"认证头+Content-Type"，orjson直发字节体时复用
+        self._json_headers: Optional[Dict[str, str]] = None
+        self._pending: Dict[ResponseAction, List[Tuple[SecurityEntity, Optional[Dict[str, Any]], asyncio.Future]]] = {}
+        self._bulk_task: Optional[asyncio.Task] = None
+        self._bulk_wakeup: Optional[asyncio.Event] = None
+        self._bulk_full: Optional[asyncio.Event] = None
+
+    async def _submit(self, url: str, payload: Dict[str, Any],
+                      headers: Dict[str, str] = None,
+                      simulate_delay: float = 0.1) -> None:
+        """
+        向下游系统提交HTTP请求
+        未注入共享客户端时（本地/测试环境）退回原有的模拟延迟路径
+        """
+        if self.http_client is None:
+            await asyncio.sleep(simulate_delay)
+            return
+        if orjson is not None:
+            # orjson直接产出字节体，跳过客户端内部较慢的json.dumps
+            if headers is None or headers is self._headers:
+                json_headers = self._json_headers
+                if json_headers is None:
+                    json_headers = dict(self._headers or {})
+                    json_headers['Content-Type'] = 'application/json'
+                    self._json_headers = json_headers
+            else:
+                json_headers = {**headers, 'Content-Type': 'application/json'}
+            response = await self.http_client.post(url, content=orjson.dumps(payload),
+                                                   headers=json_headers)
+        else:
+            response = await self.http_client.post(url, json=payload, headers=headers)
+        response.raise_for_status()
+
+    async def _enqueue_bulk(self, entity: SecurityEntity, action: ResponseAction,
+                            params: Dict[str, Any] = None) -> Tuple[bool, str]:
+        """
+        将动作加入批量队列，等待合并提交
+        同一轮事件风暴中对N个实体执行同类动作时，N次后端往返合并为1次bulk请求
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queue = self._pending.setdefault(action, [])
+        queue.append((entity, params, future))
+
+        if self._bulk_task is None or self._bulk_task.done():
+            self._bulk_wakeup = asyncio.Event()
+            self._bulk_full = asyncio.Event()
+            self._bulk_task = asyncio.create_task(self._bulk_loop())
+        self._bulk_wakeup.set()
+        if len(queue) >= self.max_batch:
+            self._bulk_full.set()
+
+        return await future
+
+    async def _bulk_loop(self):
+        """
+        常驻批量提交循环：持续风暴期间入队方只置位事件，不反复重建任务；
+        每~5ms聚合窗口冲刷一次，队列满max_batch时立即冲刷，
+        空闲超过bulk_idle_timeout后退出
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self._bulk_wakeup.wait(),
+                                       timeout=self.bulk_idle_timeout)
+            except asyncio.TimeoutError:
+                if not self._pending:
+                    break
+            self._bulk_wakeup.clear()
+            try:
+                await asyncio.wait_for(self._bulk_full.wait(), timeout=0.005)
+            except asyncio.TimeoutError:
+                pass
+            self._bulk_full.clear()
+            await self._flush_bulk()
+
+    async def _flush_bulk(self):
+        """一次冲刷把所有积压动作的bulk请求并发发出，不逐个串行等待"""
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        await asyncio.gather(*(
+            self._flush_one(action, batch) for action, batch in pending.items()
+        ))
+
+    async def _flush_one(self, action: ResponseAction,
+                         batch: List[Tuple[SecurityEntity, Optional[Dict[str, Any]], asyncio.Future]]):
+        """把同一动作的积压目标合并为一次bulk HTTP请求并回填各future"""
+        # 下划线开头的是编排器内部传递的缓存（如_entity_dict），不进bulk载荷
+        targets = [
+            {'entity_id': entity.entity_id,
+             'params': {k: v for k, v in params.items() if not k.startswith('_')} if params else {}}
+            for entity, params, _ in batch
+        ]
+        try:
+            await self._submit(self._bulk_endpoints[action],
+                               {'action': action.value, 'targets': targets},
+                               headers=self._headers)
+        except Exception as e:
+            self.logger.error("Bulk %s failed for %d targets: %s",
+                              action.value, len(batch), e)
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_result((False, f"Bulk {action.value} failed: {e}"))
+            return
+
+        self.logger.info("Bulk %s submitted for %d targets",
+                         action.value, len(batch))
+        for entity, _, future in batch:
+            if not future.done():
+                future.set_result(
+                    (True, f"Successfully executed {action.value} "
+                           f"for {entity.entity_id} (batch of {len(batch)})"))
+
     @abstractmethod
     async def execute(self, entity: SecurityEntity, action: ResponseAction, 
                      params: Dict[str, Any] = None) -> Tuple[bool, str]:
@@ -82,17 +232,31 @@ class ResponseExecutor(ABC):
 
 class FirewallExecutor(ResponseExecutor):
     """防火墙执行器"""
-    
-    def __init__(self, config: Dict[str, Any] = None):
-        super().__init__("firewall", config)
+
+    # 类级frozenset映射：can_handle免去每次调用重建dict/list
+    _ENTITY_ACTIONS = {
+        EntityType.IP: frozenset({ResponseAction.BLOCK_IP, ResponseAction.UNBLOCK_IP})
+    }
+
+    _LOGGER = logging.getLogger(f"{__name__}.firewall")
+
+    __slots__ = ('api_endpoint', 'api_key', '_url_unblock')
+
+    def __init__(self, config: Dict[str, Any] = None, http_client: Any = None):
+        super().__init__("firewall", config, http_client)
         self.api_endpoint = self.config.get('api_endpoint', 'http://firewall-api:8080')
         self.api_key = self.config.get('api_key', '')
+        self._headers = {'Authorization': self.api_key}
+        self._bulk_endpoints = {
+            ResponseAction.BLOCK_IP: f"{self.api_endpoint}/api/firewall/bulk_block"
+        }
+        # 下游入口URL固定，构造时注册一次，免去每次请求的f-string拼接
+        self._url_unblock = f"{self.api_endpoint}/api/firewall/unblock"
     
     def can_handle(self, entity: SecurityEntity, action: ResponseAction) -> bool:
         """检查是否能处理指定的实体和动作"""
-        if entity.entity_type != EntityType.IP:
-            return False
-        return action in [ResponseAction.BLOCK_IP, ResponseAction.UNBLOCK_IP]
+        allowed = self._ENTITY_ACTIONS.get(entity.entity_type)
+        return allowed is not None and action in allowed
     
     async def execute(self, entity: SecurityEntity, action: ResponseAction, 
                      params: Dict[str, Any] = None) -> Tuple[bool, str]:
@@ -101,16 +265,17 @@ class FirewallExecutor(ResponseExecutor):
             ip_address = entity.entity_id
             
             if action == ResponseAction.BLOCK_IP:
-                success, message = await self._block_ip(ip_address, params)
+                # 阻断走批量队列：事件风暴时多个IP合并为一次bulk_block
+                success, message = await self._enqueue_bulk(entity, action, params)
             elif action == ResponseAction.UNBLOCK_IP:
                 success, message = await self._unblock_ip(ip_address, params)
             else:
                 return False, f"Unsupported action: {action}"
             
             if success:
-                self.logger.info(f"Successfully executed {action.value} for IP {ip_address}")
+                self.logger.info("Successfully executed %s for IP %s", action.value, ip_address)
             else:
-                self.logger.error(f"Failed to execute {action.value} for IP {ip_address}: {message}")
+                self.logger.error("Failed to execute %s for IP %s: %s", action.value, ip_address, message)
             
             return success, message
             
@@ -119,30 +284,6 @@ class FirewallExecutor(ResponseExecutor):
             self.logger.error(error_msg)
             return False, error_msg
     
-    async def _block_ip(self, ip_address: str, params: Dict[str, Any] = None) -> Tuple[bool, str]:
-        """阻断IP地址"""
-        try:
-            # 这里实现具体的防火墙API调用
-            # 示例实现
-            rule_data = {
-                'action': 'block',
-                'source_ip': ip_address,
-                'duration': params.get('duration', 3600) if params else 3600,  # 默认1小时
-                'reason': params.get('reason', 'Security threat detected') if params else 'Security threat detected'
-            }
-            
-            # 模拟API调用
-            await asyncio.sleep(0.1)  # 模拟网络延迟
-            
-            # 实际实现中这里应该是HTTP请求
-            # response = await self._make_api_call('/api/firewall/block', rule_data)
-            
-            self.logger.info(f"Blocked IP {ip_address} with rule: {rule_data}")
-            return True, f"Successfully blocked IP {ip_address}"
-            
-        except Exception as e:
-            return False, f"Failed to block IP {ip_address}: {e}"
-    
     async def _unblock_ip(self, ip_address: str, params: Dict[str, Any] = None) -> Tuple[bool, str]:
         """解除IP阻断"""
         try:
@@ -151,10 +292,10 @@ class FirewallExecutor(ResponseExecutor):
                 'source_ip': ip_address,
                 'reason': params.get('reason', 'Manual unblock') if params else 'Manual unblock'
             }
-            
-            await asyncio.sleep(0.1)
-            
-            self.logger.info(f"Unblocked IP {ip_address}")
+
+            await self._submit(self._url_unblock, rule_data, headers=self._headers)
+
+            self.logger.info("Unblocked IP %s", ip_address)
             return True, f"Successfully unblocked IP {ip_address}"
             
         except Exception as e:
@@ -163,21 +304,37 @@ class FirewallExecutor(ResponseExecutor):
 
 class ADExecutor(ResponseExecutor):
     """Active Directory执行器"""
-    
-    def __init__(self, config: Dict[str, Any] = None):
-        super().__init__("active_directory", config)
+
+    _ENTITY_ACTIONS = {
+        EntityType.USER: frozenset({
+            ResponseAction.DISABLE_USER, ResponseAction.ENABLE_USER,
+            ResponseAction.RESET_PASSWORD, ResponseAction.REVOKE_TOKEN
+        })
+    }
+
+    _LOGGER = logging.getLogger(f"{__name__}.active_directory")
+
+    __slots__ = ('ldap_server', 'admin_user', 'admin_password', 'api_endpoint',
+                 '_url_enable', '_url_reset_password', '_url_revoke_token')
+
+    def __init__(self, config: Dict[str, Any] = None, http_client: Any = None):
+        super().__init__("active_directory", config, http_client)
         self.ldap_server = self.config.get('ldap_server', 'ldap://ad-server:389')
         self.admin_user = self.config.get('admin_user', 'admin')
         self.admin_password = self.config.get('admin_password', '')
+        # AD管理网关的REST入口，账号操作通过共享HTTP客户端提交
+        self.api_endpoint = self.config.get('api_endpoint', 'http://ad-gateway:8080')
+        self._bulk_endpoints = {
+            ResponseAction.DISABLE_USER: f"{self.api_endpoint}/api/ad/users/bulk_disable"
+        }
+        self._url_enable = f"{self.api_endpoint}/api/ad/users/enable"
+        self._url_reset_password = f"{self.api_endpoint}/api/ad/users/reset_password"
+        self._url_revoke_token = f"{self.api_endpoint}/api/ad/users/revoke_token"
     
     def can_handle(self, entity: SecurityEntity, action: ResponseAction) -> bool:
         """检查是否能处理指定的实体和动作"""
-        if entity.entity_type != EntityType.USER:
-            return False
-        return action in [
-            ResponseAction.DISABLE_USER, ResponseAction.ENABLE_USER,
-            ResponseAction.RESET_PASSWORD, ResponseAction.REVOKE_TOKEN
-        ]
+        allowed = self._ENTITY_ACTIONS.get(entity.entity_type)
+        return allowed is not None and action in allowed
     
     async def execute(self, entity: SecurityEntity, action: ResponseAction, 
                      params: Dict[str, Any] = None) -> Tuple[bool, str]:
@@ -186,7 +343,8 @@ class ADExecutor(ResponseExecutor):
             username = entity.entity_id
             
             if action == ResponseAction.DISABLE_USER:
-                success, message = await self._disable_user(username, params)
+                # 禁用走批量队列：批量封禁账户时合并为一次bulk_disable
+                success, message = await self._enqueue_bulk(entity, action, params)
             elif action == ResponseAction.ENABLE_USER:
                 success, message = await self._enable_user(username, params)
             elif action == ResponseAction.RESET_PASSWORD:
@@ -197,9 +355,9 @@ class ADExecutor(ResponseExecutor):
                 return False, f"Unsupported action: {action}"
             
             if success:
-                self.logger.info(f"Successfully executed {action.value} for user {username}")
+                self.logger.info("Successfully executed %s for user %s", action.value, username)
             else:
-                self.logger.error(f"Failed to execute {action.value} for user {username}: {message}")
+                self.logger.error("Failed to execute %s for user %s: %s", action.value, username, message)
             
             return success, message
             
@@ -208,26 +366,12 @@ class ADExecutor(ResponseExecutor):
             self.logger.error(error_msg)
             return False, error_msg
     
-    async def _disable_user(self, username: str, params: Dict[str, Any] = None) -> Tuple[bool, str]:
-        """禁用用户账户"""
-        try:
-            # 实际实现中这里应该调用LDAP API
-            await asyncio.sleep(0.1)
-            
-            reason = params.get('reason', 'Security incident') if params else 'Security incident'
-            self.logger.info(f"Disabled user {username}, reason: {reason}")
-            
-            return True, f"Successfully disabled user {username}"
-            
-        except Exception as e:
-            return False, f"Failed to disable user {username}: {e}"
-    
     async def _enable_user(self, username: str, params: Dict[str, Any] = None) -> Tuple[bool, str]:
         """启用用户账户"""
         try:
-            await asyncio.sleep(0.1)
-            
-            self.logger.info(f"Enabled user {username}")
+            await self._submit(self._url_enable, {'username': username})
+
+            self.logger.info("Enabled user %s", username)
             return True, f"Successfully enabled user {username}"
             
         except Exception as e:
@@ -236,14 +380,13 @@ class ADExecutor(ResponseExecutor):
     async def _reset_password(self, username: str, params: Dict[str, Any] = None) -> Tuple[bool, str]:
         """重置用户密码"""
         try:
-            await asyncio.sleep(0.1)
-            
-            # 生成临时密码
-            import secrets
-            import string
-            temp_password = ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(12))
-            
-            self.logger.info(f"Reset password for user {username}")
+            # 生成临时密码：一次CSPRNG抽取（~54位熵），替代逐字符choice
+            temp_password = secrets.token_urlsafe(9)[:12]
+
+            await self._submit(self._url_reset_password,
+                               {'username': username, 'temp_password': temp_password})
+
+            self.logger.info("Reset password for user %s", username)
             return True, f"Successfully reset password for user {username}, temp password: {temp_password}"
             
         except Exception as e:
@@ -252,9 +395,9 @@ class ADExecutor(ResponseExecutor):
     async def _revoke_token(self, username: str, params: Dict[str, Any] = None) -> Tuple[bool, str]:
         """撤销用户令牌"""
         try:
-            await asyncio.sleep(0.1)
-            
-            self.logger.info(f"Revoked tokens for user {username}")
+            await self._submit(self._url_revoke_token, {'username': username})
+
+            self.logger.info("Revoked tokens for user %s", username)
             return True, f"Successfully revoked tokens for user {username}"
             
         except Exception as e:
@@ -263,135 +406,202 @@ class ADExecutor(ResponseExecutor):
 
 class EDRExecutor(ResponseExecutor):
     """EDR执行器"""
-    
-    def __init__(self, config: Dict[str, Any] = None):
-        super().__init__("edr", config)
+
+    _ENTITY_ACTIONS = {
+        EntityType.DEVICE: frozenset({
+            ResponseAction.ISOLATE_HOST, ResponseAction.TAKE_SNAPSHOT, ResponseAction.DUMP_MEMORY
+        }),
+        EntityType.FILE: frozenset({
+            ResponseAction.QUARANTINE_FILE, ResponseAction.DELETE_FILE, ResponseAction.RESTORE_FILE
+        }),
+        EntityType.PROCESS: frozenset({
+            ResponseAction.KILL_PROCESS, ResponseAction.SUSPEND_PROCESS
+        })
+    }
+
+    _LOGGER = logging.getLogger(f"{__name__}.edr")
+
+    __slots__ = ('edr_api_endpoint', 'api_key', '_handlers_by_entity_type',
+                 '_url_isolate', '_url_snapshot', '_url_memdump',
+                 '_url_delete', '_url_restore', '_url_kill', '_url_suspend')
+
+    def __init__(self, config: Dict[str, Any] = None, http_client: Any = None):
+        super().__init__("edr", config, http_client)
         self.edr_api_endpoint = self.config.get('api_endpoint', 'http://edr-server:8080')
         self.api_key = self.config.get('api_key', '')
-    
+        self._headers = {'Authorization': self.api_key}
+        self._bulk_endpoints = {
+            ResponseAction.QUARANTINE_FILE: f"{self.edr_api_endpoint}/api/files/bulk_quarantine"
+        }
+        self._url_isolate = f"{self.edr_api_endpoint}/api/devices/isolate"
+        self._url_snapshot = f"{self.edr_api_endpoint}/api/devices/snapshot"
+        self._url_memdump = f"{self.edr_api_endpoint}/api/devices/memdump"
+        self._url_delete = f"{self.edr_api_endpoint}/api/files/delete"
+        self._url_restore = f"{self.edr_api_endpoint}/api/files/restore"
+        self._url_kill = f"{self.edr_api_endpoint}/api/processes/kill"
+        self._url_suspend = f"{self.edr_api_endpoint}/api/processes/suspend"
+        # 动作 -> 处理协程 的派发表，execute免去逐动作if/elif比较
+        self._handlers_by_entity_type = {
+            EntityType.DEVICE: {
+                ResponseAction.ISOLATE_HOST: self._do_isolate_host,
+                ResponseAction.TAKE_SNAPSHOT: self._do_take_snapshot,
+                ResponseAction.DUMP_MEMORY: self._do_dump_memory
+            },
+            EntityType.FILE: {
+                ResponseAction.QUARANTINE_FILE: self._do_quarantine_file,
+                ResponseAction.DELETE_FILE: self._do_delete_file,
+                ResponseAction.RESTORE_FILE: self._do_restore_file
+            },
+            EntityType.PROCESS: {
+                ResponseAction.KILL_PROCESS: self._do_kill_process,
+                ResponseAction.SUSPEND_PROCESS: self._do_suspend_process
+            }
+        }
+
     def can_handle(self, entity: SecurityEntity, action: ResponseAction) -> bool:
         """检查是否能处理指定的实体和动作"""
-        entity_actions = {
-            EntityType.DEVICE: [ResponseAction.ISOLATE_HOST, ResponseAction.TAKE_SNAPSHOT, ResponseAction.DUMP_MEMORY],
-            EntityType.FILE: [ResponseAction.QUARANTINE_FILE, ResponseAction.DELETE_FILE, ResponseAction.RESTORE_FILE],
-            EntityType.PROCESS: [ResponseAction.KILL_PROCESS, ResponseAction.SUSPEND_PROCESS]
-        }
-        
-        return entity.entity_type in entity_actions and action in entity_actions[entity.entity_type]
-    
-    async def execute(self, entity: SecurityEntity, action: ResponseAction, 
+        allowed = self._ENTITY_ACTIONS.get(entity.entity_type)
+        return allowed is not None and action in allowed
+
+    async def execute(self, entity: SecurityEntity, action: ResponseAction,
                      params: Dict[str, Any] = None) -> Tuple[bool, str]:
         """执行EDR操作"""
         try:
-            if entity.entity_type == EntityType.DEVICE:
-                return await self._execute_device_action(entity, action, params)
-            elif entity.entity_type == EntityType.FILE:
-                return await self._execute_file_action(entity, action, params)
-            elif entity.entity_type == EntityType.PROCESS:
-                return await self._execute_process_action(entity, action, params)
-            else:
+            handlers = self._handlers_by_entity_type.get(entity.entity_type)
+            if handlers is None:
                 return False, f"Unsupported entity type: {entity.entity_type}"
-                
+
+            handler = handlers.get(action)
+            if handler is None:
+                return False, f"Unsupported action: {action}"
+
+            return await handler(entity, params)
+
         except Exception as e:
             error_msg = f"Error executing EDR action: {e}"
             self.logger.error(error_msg)
             return False, error_msg
-    
-    async def _execute_device_action(self, entity: SecurityEntity, action: ResponseAction, 
-                                   params: Dict[str, Any] = None) -> Tuple[bool, str]:
-        """执行设备相关操作"""
+
+    async def _do_isolate_host(self, entity: SecurityEntity,
+                               params: Dict[str, Any] = None) -> Tuple[bool, str]:
+        """隔离主机"""
         device_id = entity.entity_id
-        
         try:
-            if action == ResponseAction.ISOLATE_HOST:
-                await asyncio.sleep(0.2)
-                self.logger.info(f"Isolated host {device_id}")
-                return True, f"Successfully isolated host {device_id}"
-                
-            elif action == ResponseAction.TAKE_SNAPSHOT:
-                await asyncio.sleep(0.5)
-                snapshot_id = f"snapshot_{device_id}_{int(datetime.now().timestamp())}"
-                self.logger.info(f"Created snapshot {snapshot_id} for host {device_id}")
-                return True, f"Successfully created snapshot {snapshot_id}"
-                
-            elif action == ResponseAction.DUMP_MEMORY:
-                await asyncio.sleep(1.0)
-                dump_id = f"memdump_{device_id}_{int(datetime.now().timestamp())}"
-                self.logger.info(f"Created memory dump {dump_id} for host {device_id}")
-                return True, f"Successfully created memory dump {dump_id}"
-                
-            else:
-                return False, f"Unsupported device action: {action}"
-                
+            await self._submit(self._url_isolate,
+                               {'device_id': device_id},
+                               headers=self._headers, simulate_delay=0.2)
+            self.logger.info("Isolated host %s", device_id)
+            return True, f"Successfully isolated host {device_id}"
         except Exception as e:
-            return False, f"Failed to execute device action {action}: {e}"
-    
-    async def _execute_file_action(self, entity: SecurityEntity, action: ResponseAction, 
-                                 params: Dict[str, Any] = None) -> Tuple[bool, str]:
-        """执行文件相关操作"""
+            return False, f"Failed to execute device action {ResponseAction.ISOLATE_HOST}: {e}"
+
+    async def _do_take_snapshot(self, entity: SecurityEntity,
+                                params: Dict[str, Any] = None) -> Tuple[bool, str]:
+        """创建主机快照"""
+        device_id = entity.entity_id
+        try:
+            snapshot_id = f"snapshot_{device_id}_{time_ns() // 1_000_000_000}"
+            await self._submit(self._url_snapshot,
+                               {'device_id': device_id, 'snapshot_id': snapshot_id},
+                               headers=self._headers, simulate_delay=0.5)
+            self.logger.info("Created snapshot %s for host %s", snapshot_id, device_id)
+            return True, f"Successfully created snapshot {snapshot_id}"
+        except Exception as e:
+            return False, f"Failed to execute device action {ResponseAction.TAKE_SNAPSHOT}: {e}"
+
+    async def _do_dump_memory(self, entity: SecurityEntity,
+                              params: Dict[str, Any] = None) -> Tuple[bool, str]:
+        """转储主机内存"""
+        device_id = entity.entity_id
+        try:
+            dump_id = f"memdump_{device_id}_{time_ns() // 1_000_000_000}"
+            await self._submit(self._url_memdump,
+                               {'device_id': device_id, 'dump_id': dump_id},
+                               headers=self._headers, simulate_delay=1.0)
+            self.logger.info("Created memory dump %s for host %s", dump_id, device_id)
+            return True, f"Successfully created memory dump {dump_id}"
+        except Exception as e:
+            return False, f"Failed to execute device action {ResponseAction.DUMP_MEMORY}: {e}"
+
+    async def _do_quarantine_file(self, entity: SecurityEntity,
+                                  params: Dict[str, Any] = None) -> Tuple[bool, str]:
+        """隔离文件（走批量队列：批量处置时合并为一次bulk_quarantine）"""
+        return await self._enqueue_bulk(entity, ResponseAction.QUARANTINE_FILE, params)
+
+    async def _do_delete_file(self, entity: SecurityEntity,
+                              params: Dict[str, Any] = None) -> Tuple[bool, str]:
+        """删除文件"""
         file_path = entity.entity_id
-        
         try:
-            if action == ResponseAction.QUARANTINE_FILE:
-                await asyncio.sleep(0.1)
-                quarantine_id = f"quarantine_{int(datetime.now().timestamp())}"
-                self.logger.info(f"Quarantined file {file_path} with ID {quarantine_id}")
-                return True, f"Successfully quarantined file {file_path}"
-                
-            elif action == ResponseAction.DELETE_FILE:
-                await asyncio.sleep(0.1)
-                self.logger.info(f"Deleted file {file_path}")
-                return True, f"Successfully deleted file {file_path}"
-                
-            elif action == ResponseAction.RESTORE_FILE:
-                await asyncio.sleep(0.1)
-                self.logger.info(f"Restored file {file_path}")
-                return True, f"Successfully restored file {file_path}"
-                
-            else:
-                return False, f"Unsupported file action: {action}"
-                
+            await self._submit(self._url_delete,
+                               {'file_path': file_path}, headers=self._headers)
+            self.logger.info("Deleted file %s", file_path)
+            return True, f"Successfully deleted file {file_path}"
         except Exception as e:
-            return False, f"Failed to execute file action {action}: {e}"
-    
-    async def _execute_process_action(self, entity: SecurityEntity, action: ResponseAction, 
-                                    params: Dict[str, Any] = None) -> Tuple[bool, str]:
-        """执行进程相关操作"""
+            return False, f"Failed to execute file action {ResponseAction.DELETE_FILE}: {e}"
+
+    async def _do_restore_file(self, entity: SecurityEntity,
+                               params: Dict[str, Any] = None) -> Tuple[bool, str]:
+        """恢复文件"""
+        file_path = entity.entity_id
+        try:
+            await self._submit(self._url_restore,
+                               {'file_path': file_path}, headers=self._headers)
+            self.logger.info("Restored file %s", file_path)
+            return True, f"Successfully restored file {file_path}"
+        except Exception as e:
+            return False, f"Failed to execute file action {ResponseAction.RESTORE_FILE}: {e}"
+
+    async def _do_kill_process(self, entity: SecurityEntity,
+                               params: Dict[str, Any] = None) -> Tuple[bool, str]:
+        """终止进程"""
         process_name = entity.entity_id
-        
         try:
-            if action == ResponseAction.KILL_PROCESS:
-                await asyncio.sleep(0.1)
-                self.logger.info(f"Killed process {process_name}")
-                return True, f"Successfully killed process {process_name}"
-                
-            elif action == ResponseAction.SUSPEND_PROCESS:
-                await asyncio.sleep(0.1)
-                self.logger.info(f"Suspended process {process_name}")
-                return True, f"Successfully suspended process {process_name}"
-                
-            else:
-                return False, f"Unsupported process action: {action}"
-                
+            await self._submit(self._url_kill,
+                               {'process_name': process_name}, headers=self._headers)
+            self.logger.info("Killed process %s", process_name)
+            return True, f"Successfully killed process {process_name}"
+        except Exception as e:
+            return False, f"Failed to execute process action {ResponseAction.KILL_PROCESS}: {e}"
+
+    async def _do_suspend_process(self, entity: SecurityEntity,
+                                  params: Dict[str, Any] = None) -> Tuple[bool, str]:
+        """挂起进程"""
+        process_name = entity.entity_id
+        try:
+            await self._submit(self._url_suspend,
+                               {'process_name': process_name}, headers=self._headers)
+            self.logger.info("Suspended process %s", process_name)
+            return True, f"Successfully suspended process {process_name}"
         except Exception as e:
-            return False, f"Failed to execute process action {action}: {e}"
+            return False, f"Failed to execute process action {ResponseAction.SUSPEND_PROCESS}: {e}"
 
 
 class AlertExecutor(ResponseExecutor):
     """告警执行器"""
-    
-    def __init__(self, config: Dict[str, Any] = None):
-        super().__init__("alert", config)
+
+    # 告警类动作对所有实体类型生效，只按动作过滤
+    _ACTIONS = frozenset({
+        ResponseAction.SEND_ALERT, ResponseAction.CREATE_TICKET,
+        ResponseAction.NOTIFY_ADMIN, ResponseAction.COLLECT_EVIDENCE
+    })
+
+    _LOGGER = logging.getLogger(f"{__name__}.alert")
+
+    __slots__ = ('email_server', 'webhook_url', 'ticket_system_api',
+                 'notify_api', 'evidence_api')
+
+    def __init__(self, config: Dict[str, Any] = None, http_client: Any = None):
+        super().__init__("alert", config, http_client)
         self.email_server = self.config.get('email_server', 'smtp.company.com')
-        self.webhook_url = self.config.get('webhook_url', '')
-        self.ticket_system_api = self.config.get('ticket_system_api', '')
+        self.webhook_url = self.config.get('webhook_url', '') or 'http://alert-gateway:8080/api/alerts'
+        self.ticket_system_api = self.config.get('ticket_system_api', '') or 'http://alert-gateway:8080/api/tickets'
+        self.notify_api = self.config.get('notify_api', 'http://alert-gateway:8080/api/notifications')
+        self.evidence_api = self.config.get('evidence_api', 'http://alert-gateway:8080/api/evidence')
     
     def can_handle(self, entity: SecurityEntity, action: ResponseAction) -> bool:
         """检查是否能处理指定的实体和动作"""
-        return action in [
-            ResponseAction.SEND_ALERT, ResponseAction.CREATE_TICKET, 
-            ResponseAction.NOTIFY_ADMIN, ResponseAction.COLLECT_EVIDENCE
-        ]
+        return action in self._ACTIONS
     
     async def execute(self, entity: SecurityEntity, action: ResponseAction, 
                      params: Dict[str, Any] = None) -> Tuple[bool, str]:
@@ -421,14 +631,13 @@ class AlertExecutor(ResponseExecutor):
                 'entity_id': entity.entity_id,
                 'risk_score': entity.risk_score,
                 'threat_level': entity.threat_level.value,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': _iso_now(),
                 'message': params.get('message', 'Security threat detected') if params else 'Security threat detected'
             }
             
-            # 模拟发送告警
-            await asyncio.sleep(0.1)
-            
-            self.logger.info(f"Sent alert for entity {entity.entity_id}: {alert_data}")
+            await self._submit(self.webhook_url, alert_data)
+
+            self.logger.info("Sent alert for entity %s: %s", entity.entity_id, alert_data)
             return True, f"Successfully sent alert for entity {entity.entity_id}"
             
         except Exception as e:
@@ -442,13 +651,13 @@ class AlertExecutor(ResponseExecutor):
                 'description': f"Risk Score: {entity.risk_score}, Threat Level: {entity.threat_level.value}",
                 'priority': 'High' if entity.risk_score >= 70 else 'Medium',
                 'assignee': params.get('assignee', 'security-team') if params else 'security-team',
-                'entity_data': entity.to_dict()
+                'entity_data': (params.get('_entity_dict') if params else None) or entity.to_dict()
             }
-            
-            await asyncio.sleep(0.2)
-            
-            ticket_id = f"SEC-{int(datetime.now().timestamp())}"
-            self.logger.info(f"Created ticket {ticket_id} for entity {entity.entity_id}")
+
+            await self._submit(self.ticket_system_api, ticket_data, simulate_delay=0.2)
+
+            ticket_id = f"SEC-{time_ns() // 1_000_000_000}"
+            self.logger.info("Created ticket %s for entity %s", ticket_id, entity.entity_id)
             
             return True, f"Successfully created ticket {ticket_id}"
             
@@ -463,13 +672,13 @@ class AlertExecutor(ResponseExecutor):
                 'body': f"Entity: {entity.entity_type.value} {entity.entity_id}\n"
                        f"Risk Score: {entity.risk_score}\n"
                        f"Threat Level: {entity.threat_level.value}\n"
-                       f"Time: {datetime.now().isoformat()}",
+                       f"Time: {_iso_now()}",
                 'recipients': params.get('recipients', ['admin@company.com']) if params else ['admin@company.com']
             }
-            
-            await asyncio.sleep(0.1)
-            
-            self.logger.info(f"Sent admin notification for entity {entity.entity_id}")
+
+            await self._submit(self.notify_api, notification_data)
+
+            self.logger.info("Sent admin notification for entity %s", entity.entity_id)
             return True, f"Successfully notified admin about entity {entity.entity_id}"
             
         except Exception as e:
@@ -479,16 +688,16 @@ class AlertExecutor(ResponseExecutor):
         """收集证据"""
         try:
             evidence_data = {
-                'entity_info': entity.to_dict(),
-                'collection_time': datetime.now().isoformat(),
+                'entity_info': (params.get('_entity_dict') if params else None) or entity.to_dict(),
+                'collection_time': _iso_now(),
                 'collection_type': params.get('collection_type', 'automatic') if params else 'automatic',
-                'evidence_id': f"evidence_{entity.entity_type.value}_{int(datetime.now().timestamp())}"
+                'evidence_id': f"evidence_{entity.entity_type.value}_{time_ns() // 1_000_000_000}"
             }
-            
-            await asyncio.sleep(0.3)
-            
+
+            await self._submit(self.evidence_api, evidence_data, simulate_delay=0.3)
+
             evidence_id = evidence_data['evidence_id']
-            self.logger.info(f"Collected evidence {evidence_id} for entity {entity.entity_id}")
+            self.logger.info("Collected evidence %s for entity %s", evidence_id, entity.entity_id)
             
             return True, f"Successfully collected evidence {evidence_id}"
             
@@ -499,16 +708,20 @@ class AlertExecutor(ResponseExecutor):
 class ResponseOrchestrator:
     """响应编排器"""
     
-    def __init__(self, config: Dict[str, Any] = None):
+    def __init__(self, config: Dict[str, Any] = None, http_client: Any = None):
         self.logger = logging.getLogger(__name__)
+        # 预计算INFO是否开启，热路径日志先查标志再格式化
+        self._info_on = self.logger.isEnabledFor(logging.INFO)
         self.config = config or {}
-        
-        # 初始化各种执行器
+        # 共享的异步HTTP客户端（连接池），供执行器向下游系统发请求时复用
+        self.http_client = http_client
+
+        # 初始化各种执行器，注入共享HTTP客户端
         self.executors: List[ResponseExecutor] = [
-            FirewallExecutor(self.config.get('firewall', {})),
-            ADExecutor(self.config.get('ad', {})),
-            EDRExecutor(self.config.get('edr', {})),
-            AlertExecutor(self.config.get('alert', {}))
+            FirewallExecutor(self.config.get('firewall', {}), http_client=http_client),
+            ADExecutor(self.config.get('ad', {}), http_client=http_client),
+            EDRExecutor(self.config.get('edr', {}), http_client=http_client),
+            AlertExecutor(self.config.get('alert', {}), http_client=http_client)
         ]
         
         # 定义响应策略 - 根据风险分数确定响应动作
@@ -520,7 +733,17 @@ class ResponseOrchestrator:
             95: [ResponseAction.BLOCK_IP, ResponseAction.DISABLE_USER, ResponseAction.ISOLATE_HOST, 
                 ResponseAction.SEND_ALERT, ResponseAction.CREATE_TICKET, ResponseAction.NOTIFY_ADMIN, ResponseAction.COLLECT_EVIDENCE]  # 极严重：全面响应
         }
-        
+
+        # 阈值从高到低预排序，动作列表冻结为tuple，免去每次评估的sorted()
+        self._policy_tiers = sorted(
+            ((threshold, tuple(actions)) for threshold, actions in self.response_policies.items()),
+            key=lambda kv: -kv[0]
+        )
+
+        # 预计算 (实体类型, 动作) -> 执行器 派发表，替代逐执行器can_handle线性扫描
+        self._dispatch: Dict[Tuple[EntityType, ResponseAction], ResponseExecutor] = {}
+        self._build_dispatch()
+
         # 响应动作优先级
         self.action_priorities = {
             ResponseAction.BLOCK_IP: 1,
@@ -533,6 +756,11 @@ class ResponseOrchestrator:
             ResponseAction.NOTIFY_ADMIN: 5,
             ResponseAction.COLLECT_EVIDENCE: 6
         }
+
+        # 补全缺省优先级并绑定__getitem__，排序键走C级字典查找而非Python闭包
+        self._priority_key = {
+            action: self.action_priorities.get(action, 10) for action in ResponseAction
+        }.__getitem__
     
     async def execute_response(self, entity: SecurityEntity, 
                              custom_actions: List[ResponseAction] = None) -> List[Dict[str, Any]]:
@@ -547,164 +775,192 @@ class ResponseOrchestrator:
                 actions = self._determine_actions(entity.risk_score)
             
             if not actions:
-                self.logger.info(f"No actions determined for entity {entity.entity_id} with risk score {entity.risk_score}")
+                self.logger.info("No actions determined for entity %s with risk score %s", entity.entity_id, entity.risk_score)
                 return results
             
             # 按优先级排序动作
-            sorted_actions = sorted(actions, key=lambda x: self.action_priorities.get(x, 10))
+            sorted_actions = sorted(actions, key=self._priority_key)
             
-            self.logger.info(f"Executing {len(sorted_actions)} actions for entity {entity.entity_id}")
+            self.logger.info("Executing %s actions for entity %s", len(sorted_actions), entity.entity_id)
             
-            # 并行执行所有动作
+            # 实体字典整个响应只构建一次，工单/取证等动作经params复用
+            shared_params = {'_entity_dict': entity.to_dict()}
+
+            # 并行执行所有动作，信号量限制峰值并发
+            semaphore = asyncio.Semaphore(int(self.config.get('max_concurrent', 32)))
+
+            async def _bounded(act: ResponseAction, act_executor: ResponseExecutor) -> Dict[str, Any]:
+                async with semaphore:
+                    try:
+                        return await self._execute_single_action(entity, act, act_executor, shared_params)
+                    except Exception as exc:
+                        self.logger.error("Action %s failed with exception: %s", act.value, exc)
+                        return {
+                            'action': act.value,
+                            'status': _STATUS_FAILED,
+                            'message': str(exc),
+                            'timestamp': _iso_now()
+                        }
+
             tasks = []
             for action in sorted_actions:
                 executor = self._find_executor(entity, action)
                 if executor:
-                    task = self._execute_single_action(entity, action, executor)
-                    tasks.append(task)
+                    tasks.append(_bounded(action, executor))
                 else:
-                    self.logger.warning(f"No executor found for action {action} on entity {entity.entity_id}")
+                    self.logger.warning("No executor found for action %s on entity %s", action, entity.entity_id)
                     results.append({
                         'action': action.value,
-                        'status': ResponseStatus.FAILED.value,
+                        'status': _STATUS_FAILED,
                         'message': 'No suitable executor found',
-                        'timestamp': datetime.now().isoformat()
+                        'timestamp': _iso_now()
                     })
-            
-            # 等待所有任务完成
-            if tasks:
-                task_results = await asyncio.gather(*tasks, return_exceptions=True)
-                
-                for i, result in enumerate(task_results):
-                    if isinstance(result, Exception):
-                        self.logger.error(f"Task {i} failed with exception: {result}")
-                        results.append({
-                            'action': sorted_actions[i].value,
-                            'status': ResponseStatus.FAILED.value,
-                            'message': str(result),
-                            'timestamp': datetime.now().isoformat()
-                        })
-                    else:
-                        results.append(result)
-            
+
+            # 结果随完成即时回收并顺手计数，免去收尾时对results的两次扫描
+            succ = 0
+            fail = len(results)  # 此前追加的都是找不到执行器的失败项
+            for future in asyncio.as_completed(tasks):
+                result = await future
+                results.append(result)
+                if result.get('status') is _STATUS_SUCCESS:
+                    succ += 1
+                else:
+                    fail += 1
+
             # 更新实体状态
             self._update_entity_status(entity, results)
-            
+
             # 记录响应结果
-            self.logger.info(f"Response execution completed for entity {entity.entity_id}. "
-                           f"Successful: {sum(1 for r in results if r.get('status') == ResponseStatus.SUCCESS.value)}, "
-                           f"Failed: {sum(1 for r in results if r.get('status') == ResponseStatus.FAILED.value)}")
+            self.logger.info("Response execution completed for entity %s. Successful: %s, Failed: %s",
+                             entity.entity_id, succ, fail)
             
         except Exception as e:
             error_msg = f"Error in response orchestration for entity {entity.entity_id}: {e}"
             self.logger.error(error_msg)
             results.append({
                 'action': 'orchestration',
-                'status': ResponseStatus.FAILED.value,
+                'status': _STATUS_FAILED,
                 'message': error_msg,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': _iso_now()
             })
         
         return results
     
-    async def _execute_single_action(self, entity: SecurityEntity, action: ResponseAction, 
-                                   executor: ResponseExecutor) -> Dict[str, Any]:
+    async def _execute_single_action(self, entity: SecurityEntity, action: ResponseAction,
+                                   executor: ResponseExecutor,
+                                   params: Dict[str, Any] = None) -> Dict[str, Any]:
         """执行单个响应动作"""
-        start_time = datetime.now()
-        
+        t0 = perf_counter_ns()
+
         try:
-            self.logger.info(f"Executing action {action.value} for entity {entity.entity_id} using executor {executor.executor_id}")
-            
-            success, message = await executor.execute(entity, action)
-            
-            end_time = datetime.now()
-            execution_time = (end_time - start_time).total_seconds()
+            if self._info_on:
+                self.logger.info("Executing action %s for entity %s using executor %s",
+                                 action.value, entity.entity_id, executor.executor_id)
             
+            success, message = await executor.execute(entity, action, params)
+
+            execution_time = (perf_counter_ns() - t0) / 1e9
+
             result = {
                 'action': action.value,
-                'status': ResponseStatus.SUCCESS.value if success else ResponseStatus.FAILED.value,
+                'status': _STATUS_SUCCESS if success else _STATUS_FAILED,
                 'message': message,
                 'executor': executor.executor_id,
                 'execution_time': execution_time,
-                'timestamp': end_time.isoformat()
+                'timestamp': _iso_now()
             }
-            
+
             if success:
-                self.logger.info(f"Successfully executed {action.value} for entity {entity.entity_id}")
+                self.logger.info("Successfully executed %s for entity %s", action.value, entity.entity_id)
             else:
-                self.logger.error(f"Failed to execute {action.value} for entity {entity.entity_id}: {message}")
+                self.logger.error("Failed to execute %s for entity %s: %s", action.value, entity.entity_id, message)
             
             return result
             
         except Exception as e:
-            end_time = datetime.now()
-            execution_time = (end_time - start_time).total_seconds()
-            
+            execution_time = (perf_counter_ns() - t0) / 1e9
+
             error_msg = f"Exception during action execution: {e}"
             self.logger.error(error_msg)
-            
+
             return {
                 'action': action.value,
-                'status': ResponseStatus.FAILED.value,
+                'status': _STATUS_FAILED,
                 'message': error_msg,
                 'executor': executor.executor_id,
                 'execution_time': execution_time,
-                'timestamp': end_time.isoformat()
+                'timestamp': _iso_now()
             }
     
-    def _determine_actions(self, risk_score: float) -> List[ResponseAction]:
-        """根据风险分数确定响应动作"""
-        for threshold in sorted(self.response_policies.keys(), reverse=True):
+    def _determine_actions(self, risk_score: float) -> Tuple[ResponseAction, ...]:
+        """根据风险分数确定响应动作（预排序阈值表，取首个命中档位）"""
+        for threshold, actions in self._policy_tiers:
             if risk_score >= threshold:
-                return self.response_policies[threshold]
-        return []
-    
+                return actions
+        return ()
+    
+    def _build_dispatch(self):
+        """用探针实体枚举所有(实体类型, 动作)组合，预计算派发表"""
+        dispatch = {}
+        for entity_type in EntityType:
+            probe = SecurityEntity(entity_type=entity_type, entity_id='')
+            for action in ResponseAction:
+                for executor in self.executors:
+                    if executor.can_handle(probe, action):
+                        dispatch[(entity_type, action)] = executor
+                        break
+        self._dispatch = dispatch
+
     def _find_executor(self, entity: SecurityEntity, action: ResponseAction) -> Optional[ResponseExecutor]:
-        """查找能处理指定动作的执行器"""
-        for executor in self.executors:
-            if executor.can_handle(entity, action):
-                return executor
-        return None
-    
+        """查找能处理指定动作的执行器（O(1)派发表）"""
+        return self._dispatch.get((entity.entity_type, action))
+    
+    # 状态规则按优先级排列：命中首条即更新，全部未中则落到INVESTIGATED
+    _STATUS_RULES = [
+        (ResponseAction.BLOCK_IP.value, EntityStatus.BLOCKED, "IP已被阻断"),
+        (ResponseAction.DISABLE_USER.value, EntityStatus.BLEEDING_STOP, "用户已被禁用，执行止血操作"),
+        (ResponseAction.QUARANTINE_FILE.value, EntityStatus.BLOCKED, "文件已被隔离"),
+        (ResponseAction.ISOLATE_HOST.value, EntityStatus.BLOCKED, "主机已被隔离")
+    ]
+
     def _update_entity_status(self, entity: SecurityEntity, results: List[Dict[str, Any]]):
         """根据响应结果更新实体状态"""
-        successful_actions = [r for r in results if r.get('status') == ResponseStatus.SUCCESS.value]
-        
+        successful_actions = [r for r in results if r.get('status') is _STATUS_SUCCESS]
+
         if not successful_actions:
             return
-        
-        # 根据成功执行的动作更新实体状态
+
+        # 根据成功执行的动作更新实体状态：建一次set，按优先级规则表查找
         action_values = [r.get('action') for r in successful_actions]
-        
-        if ResponseAction.BLOCK_IP.value in action_values:
-            entity.update_status(EntityStatus.BLOCKED, "IP已被阻断")
-        elif ResponseAction.DISABLE_USER.value in action_values:
-            entity.update_status(EntityStatus.BLEEDING_STOP, "用户已被禁用，执行止血操作")
-        elif ResponseAction.QUARANTINE_FILE.value in action_values:
-            entity.update_status(EntityStatus.BLOCKED, "文件已被隔离")
-        elif ResponseAction.ISOLATE_HOST.value in action_values:
-            entity.update_status(EntityStatus.BLOCKED, "主机已被隔离")
+        done = set(action_values)
+
+        for action_value, status, reason in self._STATUS_RULES:
+            if action_value in done:
+                entity.update_status(status, reason)
+                break
         else:
             entity.update_status(EntityStatus.INVESTIGATED, "已执行响应动作")
-        
+
         # 记录响应动作到实体时间线
         entity.timeline.append({
             'action': 'response_executed',
             'response_actions': action_values,
             'successful_count': len(successful_actions),
             'total_count': len(results),
-            'timestamp': int(datetime.now().timestamp())
+            'timestamp': time_ns() // 1_000_000_000
         })
     
     def add_executor(self, executor: ResponseExecutor):
         """添加新的执行器"""
         self.executors.append(executor)
-        self.logger.info(f"Added executor: {executor.executor_id}")
-    
+        self._build_dispatch()
+        self.logger.info("Added executor: %s", executor.executor_id)
+
     def remove_executor(self, executor_id: str):
         """移除执行器"""
         self.executors = [e for e in self.executors if e.executor_id != executor_id]
-        self.logger.info(f"Removed executor: {executor_id}")
+        self._build_dispatch()
+        self.logger.info("Removed executor: %s", executor_id)
     
     def get_executor_status(self) -> Dict[str, Any]:
         """获取所有执行器状态"""
@@ -4,6 +4,7 @@ Risk Scoring Engine
 """
 
 import math
+import re
 import logging
 import numpy as np
 from typing import List, Dict, Any, Tuple, Optional
@@ -13,6 +14,13 @@ import asyncio
 
 from ..models.entities import SecurityEntity, EntityType, ThreatLevel
 
+# 元数据词元提取：取连续的字母/数字/下划线/点/连字符片段
+_TOKEN_RE = re.compile(r"[\w.-]+")
+
+# 黑名单与加密/打包关键字集合，供isdisjoint做一次性交集判断
+_BLACKLIST_TOKENS = frozenset({'malicious', 'suspicious', 'blocked', 'quarantined'})
+_ENCRYPTED_PACKED_TOKENS = frozenset({'encrypted', 'packed', 'compressed'})
+
 
 class RiskScoringEngine:
     """风险评分引擎"""
@@ -21,7 +29,13 @@ class RiskScoringEngine:
         self.logger = logging.getLogger(__name__)
         self.ml_model_service = ml_model_service
         self.threat_intel_service = threat_intel_service
-        
+
+        # 实体元数据词元集合缓存：entity_id -> (实体对象, frozenset)，
+        # 仅在单次指标提取过程内有效，提取结束即清除。值里钉住
+        # 实体对象本身：并发事件可能各带同id实体（同一攻击IP出现
+        # 在突发的多条事件里），命中时校验对象身份，防止互相串用
+        self._token_cache: Dict[str, tuple] = {}
+
         # 单点风险指标权重
         self.single_point_weights = {
             'threat_intel_match': 0.35,          # 威胁情报匹配
@@ -147,7 +161,11 @@ class RiskScoringEngine:
     async def _extract_single_point_indicators(self, entity: SecurityEntity) -> Dict[str, float]:
         """提取单点风险指标"""
         indicators = {}
-        
+
+        # 词元集合在提取开始时计算一次，供各_has_*/_check_*复用，
+        # 提取结束即清除，避免陈旧缓存跨请求串用
+        self._token_cache[entity.entity_id] = (entity, self._build_token_set(entity))
+
         try:
             # 威胁情报匹配检查
             indicators['threat_intel_match'] = await self._check_threat_intel_match(entity)
@@ -172,7 +190,13 @@ class RiskScoringEngine:
             
         except Exception as e:
             self.logger.error(f"Error extracting indicators for entity {entity.entity_id}: {e}")
-        
+        finally:
+            # 只清除本次提取写入的条目；并发同id事件可能已覆盖过，
+            # 此时条目归覆盖者所有，由其自己的finally负责清除
+            cached = self._token_cache.get(entity.entity_id)
+            if cached is not None and cached[0] is entity:
+                del self._token_cache[entity.entity_id]
+
         return indicators
     
     async def _check_threat_intel_match(self, entity: SecurityEntity) -> float:
@@ -236,14 +260,9 @@ class RiskScoringEngine:
         """检查黑名单匹配"""
         # 这里可以集成各种黑名单数据源
         # 示例实现
-        blacklist_indicators = [
-            'malicious', 'suspicious', 'blocked', 'quarantined'
-        ]
-        
-        for indicator in blacklist_indicators:
-            if indicator in str(entity.metadata).lower():
-                return 0.8
-        
+        if not _BLACKLIST_TOKENS.isdisjoint(self._ensure_token_set(entity)):
+            return 0.8
+
         return 0.0
     
     async def _check_ip_indicators(self, entity: SecurityEntity) -> Dict[str, float]:
@@ -452,38 +471,36 @@ class RiskScoringEngine:
     def _analyze_time_correlation(self, entities: List[SecurityEntity]) -> float:
         """分析时间相关性"""
         try:
-            # 提取所有实体的时间戳信息
-            timestamps = []
-            for entity in entities:
-                # 从时间线中提取时间戳
-                for event in entity.timeline:
-                    timestamps.append(event.get('timestamp', 0))
-                
-                # 从连接中提取时间戳
-                for connection in entity.connections:
-                    timestamps.append(connection.get('timestamp', 0))
-            
-            if len(timestamps) < 2:
+            # 提取所有实体的时间戳信息（时间线事件+连接关系）
+            # np.fromiter直接从生成器构建float64数组，避免中间list
+            timestamps = np.fromiter(
+                (event.get('timestamp', 0)
+                 for entity in entities
+                 for event in entity.timeline),
+                dtype=np.float64
+            )
+            conn_timestamps = np.fromiter(
+                (connection.get('timestamp', 0)
+                 for entity in entities
+                 for connection in entity.connections),
+                dtype=np.float64
+            )
+            timestamps = np.concatenate((timestamps, conn_timestamps))
+
+            if timestamps.size < 2:
                 return 0.0
-            
-            # 计算时间集中度
+
+            # 计算时间集中度：原地排序后用diff取相邻间隔，
+            # 方差由C内核一次算出，替代Python级sum生成器
             timestamps.sort()
-            time_ranges = []
-            for i in range(1, len(timestamps)):
-                time_ranges.append(timestamps[i] - timestamps[i-1])
-            
-            if not time_ranges:
-                return 0.0
-            
-            # 计算时间方差，方差小说明时间集中度高
-            mean_range = sum(time_ranges) / len(time_ranges)
-            variance = sum((x - mean_range) ** 2 for x in time_ranges) / len(time_ranges)
-            
+            time_ranges = np.diff(timestamps)
+            variance = time_ranges.var()
+
             # 时间窗口内的事件越集中，相关性越高
-            correlation_score = 1.0 / (1.0 + math.sqrt(variance) / 3600)  # 标准化到小时
-            
-            return min(correlation_score, 1.0)
-            
+            correlation_score = 1.0 / (1.0 + np.sqrt(variance) / 3600)  # 标准化到小时
+
+            return min(float(correlation_score), 1.0)
+
         except Exception as e:
             self.logger.error(f"Error analyzing time correlation: {e}")
             return 0.0
@@ -506,11 +523,16 @@ class RiskScoringEngine:
             # 计算实体间的连通性
             total_possible_connections = len(entities) * (len(entities) - 1) / 2
             actual_connections = 0
-            
+
+            # 实体ID集合在循环外构建一次，循环内只做交集计数，
+            # 避免每个实体重建一遍"其他实体"集合的O(N^2)开销
+            entity_ids = frozenset(e.entity_id for e in entities)
+
             for entity_id, connected_entities in entity_graph.items():
-                # 计算与其他实体的连接数
-                other_entities = {e.entity_id for e in entities if e.entity_id != entity_id}
-                actual_connections += len(connected_entities.intersection(other_entities))
+                # 计算与其他实体的连接数（自环不计入）
+                actual_connections += len(connected_entities & entity_ids)
+                if entity_id in connected_entities:
+                    actual_connections -= 1
             
             # 连通性分数
             connectivity_score = actual_connections / max(total_possible_connections, 1)
@@ -605,6 +627,38 @@ class RiskScoringEngine:
         
         return context_entities[:10]  # 限制上下文实体数量
     
+    def _ensure_token_set(self, entity: SecurityEntity) -> frozenset:
+        """获取实体元数据的小写词元集合
+
+        原实现中每个_has_*/_check_*辅助方法都执行一次
+        str(entity.metadata).lower()全量序列化加子串扫描，
+        单个实体评分会重复序列化元数据十余次。指标提取入口
+        （_extract_single_point_indicators）会预先计算一次并缓存，
+        各检查退化为O(1)的集合成员判断；缓存只在该次提取过程内
+        有效——实体对象不归引擎持有，长期缓存会因对象回收
+        产生跨请求的陈旧匹配。命中后校验条目归属的实体对象身份：
+        并发事件的同id实体各有各的元数据，身份不符或单独调用时
+        现算现用。
+        """
+        cached = self._token_cache.get(entity.entity_id)
+        if cached is not None and cached[0] is entity:
+            return cached[1]
+        return self._build_token_set(entity)
+
+    @staticmethod
+    def _build_token_set(entity: SecurityEntity) -> frozenset:
+        """扁平化实体元数据为小写词元frozenset"""
+        tokens = set()
+        for meta_key, meta_value in entity.metadata.items():
+            for text in (str(meta_key), str(meta_value)):
+                for word in _TOKEN_RE.findall(text.lower()):
+                    tokens.add(word)
+                    # 组合词同时登记各子词，保留原子串匹配语义
+                    # （如process_injection可命中injection）
+                    if '_' in word:
+                        tokens.update(word.split('_'))
+        return frozenset(tokens)
+
     # 以下是各种检查方法的示例实现，实际项目中需要根据具体业务逻辑实现
     def _is_suspicious_location(self, location: str) -> bool:
         """检查是否为可疑地理位置"""
@@ -613,59 +667,58 @@ class RiskScoringEngine:
     
     def _has_port_scanning_behavior(self, entity: SecurityEntity) -> bool:
         """检查是否有端口扫描行为"""
-        return 'port_scan' in str(entity.metadata).lower()
-    
+        return 'port_scan' in self._ensure_token_set(entity)
+
     def _has_ddos_behavior(self, entity: SecurityEntity) -> bool:
         """检查是否有DDoS行为"""
-        return 'ddos' in str(entity.metadata).lower()
-    
+        return 'ddos' in self._ensure_token_set(entity)
+
     def _has_privilege_escalation(self, entity: SecurityEntity) -> bool:
         """检查是否有权限提升"""
-        return 'privilege_escalation' in str(entity.metadata).lower()
-    
+        return 'privilege_escalation' in self._ensure_token_set(entity)
+
     def _check_login_anomaly(self, entity: SecurityEntity) -> float:
         """检查登录异常"""
-        if 'login_anomaly' in str(entity.metadata).lower():
+        if 'login_anomaly' in self._ensure_token_set(entity):
             return 0.6
         return 0.0
-    
+
     def _has_lateral_movement(self, entity: SecurityEntity) -> bool:
         """检查是否有横向移动"""
-        return 'lateral_movement' in str(entity.metadata).lower()
-    
+        return 'lateral_movement' in self._ensure_token_set(entity)
+
     def _check_data_access_anomaly(self, entity: SecurityEntity) -> float:
         """检查数据访问异常"""
-        if 'data_access_anomaly' in str(entity.metadata).lower():
+        if 'data_access_anomaly' in self._ensure_token_set(entity):
             return 0.5
         return 0.0
-    
+
     def _has_modification(self, entity: SecurityEntity) -> bool:
         """检查文件是否被修改"""
-        return 'modified' in str(entity.metadata).lower()
-    
+        return 'modified' in self._ensure_token_set(entity)
+
     def _is_encrypted_or_packed(self, entity: SecurityEntity) -> bool:
         """检查文件是否加密或打包"""
-        return any(keyword in str(entity.metadata).lower() 
-                  for keyword in ['encrypted', 'packed', 'compressed'])
-    
+        return not _ENCRYPTED_PACKED_TOKENS.isdisjoint(self._ensure_token_set(entity))
+
     async def _check_malicious_hash(self, entity: SecurityEntity) -> float:
         """检查恶意哈希"""
         # 这里可以集成各种哈希黑名单数据库
-        if 'malicious' in str(entity.metadata).lower():
+        if 'malicious' in self._ensure_token_set(entity):
             return 0.9
         return 0.0
-    
+
     def _has_anomalous_behavior(self, entity: SecurityEntity) -> bool:
         """检查是否有异常行为"""
         return entity.metadata.get('is_anomaly', False)
-    
+
     def _has_process_injection(self, entity: SecurityEntity) -> bool:
         """检查是否有进程注入"""
-        return 'injection' in str(entity.metadata).lower()
-    
+        return 'injection' in self._ensure_token_set(entity)
+
     def _has_suspicious_network_activity(self, entity: SecurityEntity) -> bool:
         """检查是否有可疑网络活动"""
-        return 'network_anomaly' in str(entity.metadata).lower()
+        return 'network_anomaly' in self._ensure_token_set(entity)
     
     def _has_suspicious_command_line(self, cmd_line: str) -> bool:
         """检查命令行是否可疑"""
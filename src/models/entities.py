@@ -38,7 +38,9 @@ class ThreatLevel(Enum):
     HIGH = "高风险"
     CRITICAL = "严重威胁"
 
-@dataclass
+# slots=True去掉实例__dict__：批量扩充会构造上万个实体，
+# 每实例可省约100B并加快属性访问
+@dataclass(slots=True)
 class SecurityEntity:
     """安全实体模型"""
     entity_type: EntityType
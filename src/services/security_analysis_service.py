@@ -20,10 +20,12 @@ from ..engines.response_executor import ResponseOrchestrator, ResponseAction
 class SecurityAnalysisService:
     """安全分析服务主类"""
     
-    def __init__(self, config: Dict[str, Any] = None):
+    def __init__(self, config: Dict[str, Any] = None, http_client: Any = None):
         self.logger = logging.getLogger(__name__)
         self.config = config or {}
-        
+        # 共享的异步HTTP客户端（连接池），由API层注入
+        self.http_client = http_client
+
         # 初始化各个引擎
         self.entity_recognizer = EntityRecognizer()
         
@@ -43,7 +45,8 @@ class SecurityAnalysisService:
         
         # 响应执行引擎
         self.response_orchestrator = ResponseOrchestrator(
-            config=self.config.get('response_config', {})
+            config=self.config.get('response_config', {}),
+            http_client=http_client
         )
         
         # 处理统计
@@ -68,7 +71,25 @@ class SecurityAnalysisService:
         # 更新配置
         self.processing_config.update(self.config.get('processing_config', {}))
     
-    async def analyze_security_event(self, log_data: Dict[str, Any], 
+    async def async_init(self) -> 'SecurityAnalysisService':
+        """异步初始化外部依赖，避免在事件循环中做阻塞连接
+
+        构造函数保持廉价（只装配对象），真正需要建连的引擎通过各自的
+        async_init钩子在这里并发初始化。
+        """
+        init_tasks = []
+        for engine in (self.connection_engine, self.risk_scoring_engine,
+                       self.response_orchestrator):
+            hook = getattr(engine, 'async_init', None)
+            if hook is not None:
+                init_tasks.append(hook())
+
+        if init_tasks:
+            await asyncio.gather(*init_tasks)
+
+        return self
+
+    async def analyze_security_event(self, log_data: Dict[str, Any],
                                    event_type: str = "security_alert") -> Dict[str, Any]:
         """
         分析单个安全事件
@@ -249,31 +270,35 @@ class SecurityAnalysisService:
     async def _execute_responses(self, entities: List[SecurityEntity]) -> List[Dict[str, Any]]:
         """执行响应动作"""
         try:
-            response_tasks = []
-            
             # 对每个高风险实体执行响应
-            for entity in entities:
-                if entity.risk_score >= self.processing_config['min_risk_threshold_for_response']:
-                    task = self.response_orchestrator.execute_response(entity)
-                    response_tasks.append((entity.entity_id, task))
-            
+            threshold = self.processing_config['min_risk_threshold_for_response']
+            target_entities = [e for e in entities if e.risk_score >= threshold]
+
+            if not target_entities:
+                return []
+
             # 并发执行所有响应任务
+            response_results = await asyncio.gather(
+                *(self.response_orchestrator.execute_response(entity)
+                  for entity in target_entities),
+                return_exceptions=True
+            )
+
             all_results = []
-            for entity_id, task in response_tasks:
-                try:
-                    results = await task
-                    for result in results:
-                        result['entity_id'] = entity_id
-                    all_results.extend(results)
-                except Exception as e:
-                    self.logger.error(f"Response execution failed for entity {entity_id}: {e}")
+            for entity, results in zip(target_entities, response_results):
+                if isinstance(results, Exception):
+                    self.logger.error(f"Response execution failed for entity {entity.entity_id}: {results}")
                     all_results.append({
-                        'entity_id': entity_id,
+                        'entity_id': entity.entity_id,
                         'status': 'error',
-                        'message': str(e),
+                        'message': str(results),
                         'timestamp': datetime.now().isoformat()
                     })
-            
+                else:
+                    for result in results:
+                        result['entity_id'] = entity.entity_id
+                    all_results.extend(results)
+
             self.logger.info(f"Executed {len(all_results)} response actions")
             return all_results
             
@@ -413,6 +438,7 @@ class SecurityAnalysisService:
 
 
 # 工厂函数，用于创建服务实例
-def create_security_analysis_service(config: Dict[str, Any] = None) -> SecurityAnalysisService:
+def create_security_analysis_service(config: Dict[str, Any] = None,
+                                     http_client: Any = None) -> SecurityAnalysisService:
     """创建安全分析服务实例"""
-    return SecurityAnalysisService(config)
\ No newline at end of file
+    return SecurityAnalysisService(config, http_client=http_client)
\ No newline at end of file